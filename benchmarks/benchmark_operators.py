@@ -0,0 +1,264 @@
+"""
+Benchmarks for the Pose Bone Transforms operators on synthetic armatures.
+
+Builds target/source armature pairs with matching bone names, both as deep chains (every bone
+parented to the previous one) and as wide fans (every bone parented to the root), and times every
+mode of the proportions transfer and of the parent transforms copy. Results are written as JSON
+so they can be compared across releases.
+
+    blender --background --factory-startup --python benchmarks/benchmark_operators.py -- --output results.json
+    blender --background --factory-startup --python benchmarks/benchmark_operators.py -- --sizes 100 1000 --repeat 5
+"""
+import argparse
+import itertools
+import json
+import math
+import os
+import random
+import sys
+import time
+
+import bpy
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if bpy.app.version >= (2, 80, 0):
+    import pose_bone_transforms as addon
+else:
+    import pose_bone_transforms_279 as addon
+
+CONSTRAINT_TYPES = ('COPY_ROTATION', 'COPY_LOCATION', 'COPY_SCALE', 'COPY_TRANSFORMS')
+SHAPES = ('chain', 'fan')
+# ----------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+def set_active(obj):
+    if bpy.app.version >= (2, 80, 0):
+        bpy.context.view_layer.objects.active = obj
+    else:
+        bpy.context.scene.objects.active = obj
+
+
+def enter_pose_mode(obj):
+    if bpy.context.object and bpy.context.object.mode != 'OBJECT':
+        bpy.ops.object.mode_set(mode='OBJECT')
+    set_active(obj)
+    bpy.ops.object.mode_set(mode='POSE')
+
+
+def create_armature(name, bone_count, shape):
+    """Creates an armature object whose bones form either a deep chain or a wide fan under one root."""
+    obj = bpy.data.objects.new(name, bpy.data.armatures.new(name))
+    if bpy.app.version >= (2, 80, 0):
+        bpy.context.scene.collection.objects.link(obj)
+    else:
+        bpy.context.scene.objects.link(obj)
+    if bpy.context.object and bpy.context.object.mode != 'OBJECT':
+        bpy.ops.object.mode_set(mode='OBJECT')
+    set_active(obj)
+    bpy.ops.object.mode_set(mode='EDIT')
+
+    edit_bones = obj.data.edit_bones
+    root = edit_bones.new('bone_0')
+    root.head, root.tail = (0.0, 0.0, 0.0), (0.0, 0.0, 1.0)
+    previous = root
+    for i in range(1, bone_count):
+        bone = edit_bones.new('bone_{}'.format(i))
+        if shape == 'chain':
+            bone.head, bone.tail = previous.tail, (0.0, 0.0, previous.tail[2] + 1.0)
+            bone.parent = previous
+            previous = bone
+        else:
+            angle = i * 2.399963  # golden angle spreads the fan evenly
+            radius = 0.5 * (i % 7 + 1)
+            bone.head, bone.tail = root.tail, (radius * math.cos(angle), radius * math.sin(angle), 2.0)
+            bone.parent = root
+
+    bpy.ops.object.mode_set(mode='OBJECT')
+    return obj
+
+
+def randomize_pose(armature, seed):
+    """Poses every bone with a random rotation, location and scale, written in bulk."""
+    rng = random.Random(seed)
+    bones = armature.pose.bones
+    quaternions = []
+    for _ in bones:
+        quaternion = [rng.uniform(-1.0, 1.0) for _ in range(4)]
+        length = sum(value * value for value in quaternion) ** 0.5
+        quaternions.extend(value / length for value in quaternion)
+    for bone in bones:
+        bone.rotation_mode = 'QUATERNION'
+    bones.foreach_set('rotation_quaternion', quaternions)
+    bones.foreach_set('location', [rng.uniform(-0.1, 0.1) for _ in range(len(bones) * 3)])
+    bones.foreach_set('scale', [rng.uniform(0.9, 1.1) for _ in range(len(bones) * 3)])
+    # foreach_set doesn't tag the armature, without it the pose would never be evaluated
+    armature.update_tag()
+
+
+def nudge_pose(armature, count):
+    """Moves the last `count` bones slightly, so that only they and their children change."""
+    for bone in armature.pose.bones[-count:]:
+        bone.location[0] += 0.01
+    armature.update_tag()
+
+
+def reset_target(target_armature, source_armature, seed_constraints=False, only_selected=False):
+    """
+    Puts the target back into its rest pose, so every run starts from the same state. Without seed_constraints
+    the target is left without constraints, with it every bone gets one COPY constraint of each type targeting
+    the source armature, as left behind by previous runs, for Clear Previous to remove. With only_selected only
+    the selected bones get them, Clear Previous leaves the others alone and Direct Apply would reject them.
+    """
+    addon.clear_constraints(target_armature.pose.bones, source_armature)
+    for i, bone in enumerate(target_armature.pose.bones):
+        bone.bone.select = i % 2 == 0
+    if seed_constraints:
+        for bone in target_armature.pose.bones:
+            if only_selected and not bone.bone.select:
+                continue
+            for constraint_type in CONSTRAINT_TYPES:
+                constraint = bone.constraints.new(constraint_type)
+                constraint.target = source_armature
+                constraint.subtarget = bone.name
+    bone_count = len(target_armature.pose.bones)
+    addon.set_pose_basis(target_armature, np.tile(np.identity(4), (bone_count, 1, 1)), np.arange(bone_count))
+
+
+def clear_scene():
+    if bpy.context.object and bpy.context.object.mode != 'OBJECT':
+        bpy.ops.object.mode_set(mode='OBJECT')
+    for obj in list(bpy.data.objects):
+        bpy.data.objects.remove(obj, do_unlink=True)
+    for armature in list(bpy.data.armatures):
+        bpy.data.armatures.remove(armature)
+
+
+def update_scene():
+    if bpy.app.version >= (2, 80, 0):
+        bpy.context.view_layer.update()
+    else:
+        bpy.context.scene.update()
+
+
+class BenchmarkApplyCopyTransformsConstraints(addon.ApplyCopyTransformsConstraints):
+    """ApplyCopyTransformsConstraints without its dialog, so that execute runs straight away when called from here."""
+    bl_idname = 'pose.benchmark_copy_transforms_from_other'
+    dialog_shown = True
+
+
+# Every option of the operator, so that no setting used by a previous call carries over
+OPERATOR_DEFAULTS = {
+    'constraint_type': 'COPY_TRANSFORMS', 'apply_visual_transform': False, 'direct_apply': False, 'incremental': False,
+    'live_sync': False, 'bake_range': False, 'only_selected': False, 'all_selected': False, 'clear_previous': False,
+    'snapshot_path': '',
+}
+
+
+def run_operator(source_armature, mode):
+    """Runs ApplyCopyTransformsConstraints.execute, report and scene update included, on the active armature."""
+    options = dict(OPERATOR_DEFAULTS, **mode)
+    bpy.ops.pose.benchmark_copy_transforms_from_other(source_armature=source_armature.name, **options)
+
+
+def time_call(function, repeat, setup=None):
+    """Returns the best of `repeat` runs in seconds, calling setup (untimed) before each one."""
+    best = float('inf')
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best
+# ----------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+def benchmark_proportions(target_armature, source_armature, repeat):
+    """
+    Times ApplyCopyTransformsConstraints.execute in every mode. Clear Previous modes start from a target
+    carrying COPY constraints of every type, the other modes from a target without constraints.
+    """
+    results = []
+    enter_pose_mode(target_armature)
+    modes = itertools.product(CONSTRAINT_TYPES, (False, True), (False, True), ((False, False), (True, False), (True, True)))
+    for constraint_type, only_selected, clear_previous, (apply_visual_transform, direct_apply) in modes:
+        mode = {
+            'constraint_type': constraint_type,
+            'only_selected': only_selected,
+            'clear_previous': clear_previous,
+            'apply_visual_transform': apply_visual_transform,
+            'direct_apply': direct_apply,
+        }
+
+        seconds = time_call(lambda: run_operator(source_armature, mode), repeat,
+                            setup=lambda: reset_target(target_armature, source_armature, clear_previous, only_selected))
+        results.append({'operator': addon.ApplyCopyTransformsConstraints.bl_idname, 'mode': mode, 'seconds': seconds})
+
+    # Re-sync after nudging a couple of source bones, the case "Only Changed Bones" is meant for
+    for constraint_type in CONSTRAINT_TYPES:
+        mode = {'constraint_type': constraint_type, 'apply_visual_transform': True, 'direct_apply': True, 'incremental': True}
+
+        def setup():
+            reset_target(target_armature, source_armature)
+            addon.apply_proportions(target_armature, source_armature, constraint_type, True, True)
+            nudge_pose(source_armature, 2)
+            update_scene()
+
+        seconds = time_call(lambda: run_operator(source_armature, mode), repeat, setup=setup)
+        results.append({'operator': addon.ApplyCopyTransformsConstraints.bl_idname, 'mode': mode, 'seconds': seconds})
+    reset_target(target_armature, source_armature)
+    return results
+
+
+def benchmark_parent_transforms(armature, repeat):
+    """Times CopyPoseBoneTransforms for the active bone and for all bones at once."""
+    results = []
+    enter_pose_mode(armature)
+    armature.data.bones.active = armature.data.bones[-1]
+    for transform_type, all_bones in itertools.product(('TRANSLATION', 'ROTATION'), (False, True)):
+        seconds = time_call(lambda: bpy.ops.pose.copy_parent_bone_transforms(type=transform_type, all_bones=all_bones), repeat)
+        results.append({'operator': addon.CopyPoseBoneTransforms.bl_idname,
+                        'mode': {'type': transform_type, 'all_bones': all_bones}, 'seconds': seconds})
+    return results
+
+
+def run_benchmarks(sizes, repeat):
+    results = []
+    for size, shape in itertools.product(sizes, SHAPES):
+        clear_scene()
+        target_armature = create_armature('target', size, shape)
+        source_armature = create_armature('source', size, shape)
+        randomize_pose(source_armature, seed=size)
+        update_scene()
+
+        for result in benchmark_proportions(target_armature, source_armature, repeat) + benchmark_parent_transforms(source_armature, repeat):
+            result.update(bones=size, shape=shape)
+            results.append(result)
+            print("{bones:>6} {shape:<6} {operator:<36} {seconds:>10.4f}s  {mode}".format(**result))
+    return results
+# ----------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+def main(argv):
+    parser = argparse.ArgumentParser(description="Benchmark the Pose Bone Transforms operators on synthetic armatures.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100, 1000, 5000], help="Bone counts to benchmark")
+    parser.add_argument('--repeat', type=int, default=3, help="Runs per measurement, the best one is kept")
+    parser.add_argument('--output', default='benchmark_results.json', help="JSON file to write the results to")
+    args = parser.parse_args(argv)
+
+    addon.register()
+    bpy.utils.register_class(BenchmarkApplyCopyTransformsConstraints)
+    try:
+        results = run_benchmarks(args.sizes, max(1, args.repeat))
+    finally:
+        bpy.utils.unregister_class(BenchmarkApplyCopyTransformsConstraints)
+        addon.unregister()
+
+    report = {
+        'addon_version': list(addon.bl_info['version']),
+        'blender_version': list(bpy.app.version),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'repeat': args.repeat,
+        'results': results,
+    }
+    with open(args.output, 'w', encoding='utf-8') as file:
+        json.dump(report, file, indent=2)
+    print("Wrote {} results to {}".format(len(results), args.output))
+# ----------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+if __name__ == "__main__":
+    main(sys.argv[sys.argv.index('--') + 1:] if '--' in sys.argv else [])
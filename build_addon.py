@@ -0,0 +1,40 @@
+"""
+Builds installable add-on zips of Pose Bone Transforms, one per Blender version of the addon.
+
+Each zip holds a package folder with the addon as __init__.py next to pose_bone_math.py, which the
+addon imports relatively, so both files are installed together with Install... in the Add-ons tab.
+
+    python build_addon.py
+    python build_addon.py --output /path/to/dist
+"""
+import argparse
+import os
+import zipfile
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+ADDONS = ('pose_bone_transforms', 'pose_bone_transforms_279')
+SHARED_MODULES = ('pose_bone_math.py',)
+
+
+def build_addon(name, output):
+    """Writes <output>/<name>.zip with the <name> package folder, returns the path of the zip."""
+    path = os.path.join(output, name + '.zip')
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as archive:
+        archive.write(os.path.join(ROOT, name + '.py'), '{}/__init__.py'.format(name))
+        for module in SHARED_MODULES:
+            archive.write(os.path.join(ROOT, module), '{}/{}'.format(name, module))
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build installable add-on zips of Pose Bone Transforms.")
+    parser.add_argument('--output', default=os.path.join(ROOT, 'dist'), help="Folder to write the zips to")
+    args = parser.parse_args()
+
+    os.makedirs(args.output, exist_ok=True)
+    for name in ADDONS:
+        print("Wrote {}".format(build_addon(name, args.output)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,218 @@
+"""
+Headless batch processing for the proportions trick (Copy Transforms From Other Armature).
+
+A manifest (JSON) lists the jobs, each one applying a source armature to a target armature
+inside a .blend file:
+
+    [
+        {"blend": "models/alyx.blend", "target": "alyx_skeleton", "source": "proportions",
+         "constraint_type": "COPY_TRANSFORMS", "apply_visual_transform": true, "direct_apply": true,
+         "output": "out/alyx.blend"},
+        ...
+    ]
+
+Only "blend", "target" and "source" are required, the other keys default to the operator's
+defaults. "bake_range": [start, end] bakes the visual transform into keyframes on those frames,
+"profile": true adds the milliseconds spent in every stage to the job's report and
+"blend_sources": [["name", weight], ...] blends several source armatures directly in place of
+"source", as does "snapshot": "path.npz" with a pose snapshot saved by the addon. Without "output" the .blend file is saved in place. Jobs on the same .blend file with
+the same output are applied one after another in the same Blender session before it is saved. The outputs of one
+.blend file are processed one after another, saving in place last, so that every output starts from the original file.
+
+Run the manifest (jobs are grouped per .blend file and output and the .blend files are fanned out over background Blender processes):
+
+    python pose_bone_batch.py manifest.json --blender /path/to/blender --processes 8
+
+Each Blender process runs this same script as a worker:
+
+    blender --background file.blend --python pose_bone_batch.py -- --worker jobs.json
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+RESULT_PREFIX = 'POSE_BONE_BATCH_RESULT '
+# Same order as PROFILE_STAGES of the addon, which cannot be imported outside of Blender
+PROFILE_STAGES = ('load', 'match', 'constraints', 'apply', 'cleanup', 'total')
+JOB_DEFAULTS = {
+    'constraint_type': 'COPY_TRANSFORMS',
+    'apply_visual_transform': False,
+    'direct_apply': False,
+    'only_selected': False,
+    'clear_previous': False,
+    'bake_range': None,
+    'name_rules': '',
+    'normalize_names': False,
+    'blend_sources': None,
+    'snapshot': None,
+    'profile': False,
+    'output': None,
+}
+# ----------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+def load_manifest(path):
+    """
+    Reads the manifest and groups its jobs by .blend file and output, so that every output is written once.
+    Returns a dict mapping every .blend file to a dict of its outputs and their jobs.
+    """
+    with open(path, encoding='utf-8') as file:
+        jobs = json.load(file)
+
+    base_dir = os.path.dirname(os.path.abspath(path))
+    groups = {}
+    for number, job in enumerate(jobs):
+        has_source = 'source' in job or 'blend_sources' in job or 'snapshot' in job
+        missing = [key for key in ('blend', 'target', 'source') if key not in job and not (key == 'source' and has_source)]
+        if missing:
+            raise ValueError("Job {} is missing {}".format(number, ', '.join(missing)))
+        job = dict(JOB_DEFAULTS, **job)
+        blend = os.path.normpath(os.path.join(base_dir, job['blend']))
+        job['output'] = os.path.normpath(os.path.join(base_dir, job['output'])) if job['output'] else blend
+        if job['snapshot']:
+            job['snapshot'] = os.path.normpath(os.path.join(base_dir, job['snapshot']))
+        groups.setdefault(blend, {}).setdefault(job['output'], []).append(job)
+    return groups
+
+
+def run_blend_file(blender, blend, jobs):
+    """Processes the jobs of one .blend file and output in a background Blender process and returns their results."""
+    with tempfile.NamedTemporaryFile('w', suffix='.json', delete=False, encoding='utf-8') as file:
+        json.dump(jobs, file)
+        jobs_path = file.name
+    try:
+        command = [blender, '--background', '--factory-startup', blend, '--python-exit-code', '1',
+                   '--python', os.path.abspath(__file__), '--', '--worker', jobs_path]
+        process = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, universal_newlines=True)
+    finally:
+        os.remove(jobs_path)
+
+    results = [json.loads(line[len(RESULT_PREFIX):]) for line in process.stdout.splitlines() if line.startswith(RESULT_PREFIX)]
+    if len(results) != len(jobs):
+        # The worker prints the results only once the output is saved, so none of the jobs took effect
+        error = "Blender exited with code {} before saving {}".format(process.returncode, jobs[0]['output'])
+        results = [{'blend': blend, 'target': job['target'], 'error': error} for job in jobs]
+        results[0]['log'] = process.stdout[-2000:]
+    elif process.returncode != 0:
+        results.append({'blend': blend, 'error': "Blender exited with code {}".format(process.returncode),
+                        'log': process.stdout[-2000:]})
+    return results
+
+
+def run_outputs(blender, blend, outputs):
+    """Runs the output groups of one .blend file one after another, saving in place last, and returns all their results."""
+    results = []
+    for output in sorted(outputs, key=lambda output: output == blend):
+        results.extend(run_blend_file(blender, blend, outputs[output]))
+    return results
+
+
+def run_manifest(manifest, blender, processes):
+    """Fans the .blend files of the manifest out over a pool of background Blender processes."""
+    groups = load_manifest(manifest)
+    with ThreadPoolExecutor(max_workers=processes) as pool:
+        futures = [pool.submit(run_outputs, blender, blend, outputs) for blend, outputs in groups.items()]
+        results = [result for future in futures for result in future.result()]
+
+    failed = [result for result in results if 'error' in result]
+    for result in results:
+        if 'error' in result:
+            print("FAILED {}{}: {}".format(result['blend'], ' ' + result['target'] if 'target' in result else '', result['error']))
+            if result.get('log'):
+                print(result['log'])
+        else:
+            print("{blend}: {target} <- {source}: {message} Matched {matched} bones "
+                  "({unmatched_source} unmatched source, {unmatched_target} unmatched target), "
+                  "constraints: {created} created, {reused} reused, {removed} removed".format(**result))
+            if result.get('profile'):
+                print("    " + " | ".join("{} {:.2f} ms".format(stage, result['profile'][stage])
+                                          for stage in PROFILE_STAGES if stage in result['profile']))
+    print("{} jobs done, {} failed.".format(len(results) - len(failed), len(failed)))
+    return 1 if failed else 0
+# ----------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+def import_addon():
+    """Imports the addon module matching the running Blender version from next to this script."""
+    import bpy
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    if bpy.app.version >= (2, 80, 0):
+        import pose_bone_transforms as addon
+    else:
+        import pose_bone_transforms_279 as addon
+    return addon
+
+
+def run_worker(jobs_path):
+    """
+    Runs inside Blender: applies every job to the open .blend file and saves it to the output shared by the jobs.
+    The results are printed only after the save, so that a failed save reports every job as failed.
+    """
+    import bpy
+    addon = import_addon()
+    with open(jobs_path, encoding='utf-8') as file:
+        jobs = json.load(file)
+
+    blend = os.path.normpath(bpy.data.filepath)
+    results = []
+    for job in jobs:
+        target_armature = bpy.data.objects.get(job['target'])
+        if job['snapshot']:
+            sources = []
+            source = job['snapshot']
+        elif job['blend_sources']:
+            sources = [(bpy.data.objects.get(name), weight) for name, weight in job['blend_sources']]
+            source = ', '.join('{}:{}'.format(name, weight) for name, weight in job['blend_sources'])
+        else:
+            sources = [(bpy.data.objects.get(job['source']), 1.0)]
+            source = job['source']
+
+        if any(not armature or armature.type != 'ARMATURE' for armature in [target_armature] + [obj for obj, _ in sources]):
+            result = {'error': "Requires a valid source armature and target armature."}
+        else:
+            try:
+                if job['snapshot']:
+                    result = addon.apply_proportions_snapshot(target_armature, job['snapshot'], job['constraint_type'], job['only_selected'],
+                                                              job['name_rules'], job['normalize_names'], job['profile'])
+                elif job['blend_sources']:
+                    result = addon.apply_proportions_blend(target_armature, sources, job['constraint_type'], job['only_selected'],
+                                                           job['clear_previous'], job['name_rules'], job['normalize_names'], job['profile'])
+                else:
+                    bake_frames = list(range(job['bake_range'][0], job['bake_range'][1] + 1)) if job['bake_range'] else None
+                    result = addon.apply_proportions(target_armature, sources[0][0], job['constraint_type'], job['apply_visual_transform'],
+                                                     job['direct_apply'], job['only_selected'], job['clear_previous'], bake_frames,
+                                                     job['name_rules'], job['normalize_names'], profile_stages=job['profile'])
+            except ValueError as error:
+                result = {'error': str(error)}
+            else:
+                result['unmatched_source'] = len(result['unmatched_source'])
+                result['unmatched_target'] = len(result['unmatched_target'])
+                result.pop('rows', None)
+        result.update(blend=blend, target=job['target'], source=source)
+        results.append(result)
+
+    if any('error' not in result for result in results):
+        output = jobs[0]['output']
+        bpy.ops.wm.save_as_mainfile(filepath=output, copy=output != blend)
+    for result in results:
+        print(RESULT_PREFIX + json.dumps(result))
+# ----------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+def main(argv):
+    parser = argparse.ArgumentParser(description="Apply proportions to many armatures across many .blend files.")
+    parser.add_argument('manifest', nargs='?', help="JSON manifest of jobs")
+    parser.add_argument('--blender', default='blender', help="Blender executable (default: blender on PATH)")
+    parser.add_argument('--processes', type=int, default=os.cpu_count() or 1, help="Number of Blender processes to run at once")
+    parser.add_argument('--worker', metavar='JOBS', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.worker:
+        run_worker(args.worker)
+        return 0
+    if not args.manifest:
+        parser.error("a manifest is required")
+    return run_manifest(args.manifest, args.blender, max(1, args.processes))
+# ----------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+if __name__ == "__main__":
+    # Inside Blender the script arguments follow '--'
+    argv = sys.argv[sys.argv.index('--') + 1:] if '--' in sys.argv else sys.argv[1:]
+    sys.exit(main(argv))
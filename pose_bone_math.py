@@ -0,0 +1,465 @@
+"""
+Blender independent math core of Pose Bone Transforms.
+
+Everything in here works on plain NumPy arrays of row-major 4x4 matrices (or on bone names) and
+does not import bpy, so proportion deltas and procedural bone values can be computed (and tested with plain pytest)
+outside of Blender, for example on asset pipeline servers. Both pose_bone_transforms.py and
+pose_bone_transforms_279.py call into this module, keep it compatible with the Python 3.5 of Blender 2.79.
+"""
+import re
+import zipfile
+import numpy as np
+# ----------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+def matrices_from_flat(flat):
+    """
+    Converts a flat array read with foreach_get from a 4x4 matrix property into a float64 (N, 4, 4) array.
+    Blender matrices are stored column-major, so they are transposed into row-major matrices.
+    """
+    return np.asarray(flat).reshape(-1, 4, 4).transpose(0, 2, 1).astype(np.float64)
+
+
+def matrices_to_flat(matrices):
+    """Converts a (N, 4, 4) array back into the flat column-major float32 layout expected by foreach_set."""
+    return np.ascontiguousarray(np.asarray(matrices).transpose(0, 2, 1), dtype=np.float32).ravel()
+
+
+def parent_indices_from_names(names, parent_names):
+    """Returns an int array holding the index of each bone's parent, or -1 for root bones (empty or None parent name)."""
+    index = {name: i for i, name in enumerate(names)}
+    return np.array([index[parent] if parent else -1 for parent in parent_names], dtype=np.int64)
+
+
+def change_space(matrices, from_world, to_world):
+    """Re-expresses armature space matrices of an object with world matrix from_world in the armature space of to_world."""
+    return np.linalg.inv(np.asarray(to_world, dtype=np.float64)) @ np.asarray(from_world, dtype=np.float64) @ matrices
+
+
+def format_vector(vector):
+    """Formats transform values the way they are pasted into QC/VRD files."""
+    return ' '.join([str(round(value, 6)) for value in vector])
+# ----------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+def invert_safe(matrices):
+    """
+    Vectorized equivalent of mathutils Matrix.inverted_safe() for a (N, 4, 4) array.
+    Degenerate matrices are nudged on the diagonal before inverting, and fall back to identity.
+    """
+    result = np.empty_like(matrices)
+    singular = np.abs(np.linalg.det(matrices)) < 1e-12
+    if not singular.all():
+        result[~singular] = np.linalg.inv(matrices[~singular])
+    if singular.any():
+        nudged = matrices[singular].copy()
+        nudged[:, [0, 1, 2], [0, 1, 2]] += 1e-8
+        still_singular = np.abs(np.linalg.det(nudged)) < 1e-12
+        nudged[~still_singular] = np.linalg.inv(nudged[~still_singular])
+        nudged[still_singular] = np.identity(4)
+        result[singular] = nudged
+    return result
+
+
+# Axis indices and parity of every euler rotation order, as in Blender's rotOrders table
+EULER_ORDERS = {'XYZ': (0, 1, 2, False), 'XZY': (0, 2, 1, True), 'YXZ': (1, 0, 2, True),
+                'YZX': (1, 2, 0, False), 'ZXY': (2, 0, 1, False), 'ZYX': (2, 1, 0, True)}
+
+
+def matrices_to_euler(matrices, order='XYZ'):
+    """
+    Vectorized equivalent of mathutils Matrix.to_euler(order) (radians) for a (N, 4, 4) array.
+    Like Blender, the rotation part is normalized and the smaller of the two possible solutions is returned.
+    """
+    i, j, k, parity = EULER_ORDERS[order]
+    rot = matrices[:, :3, :3]
+    rot = rot / np.maximum(np.linalg.norm(rot, axis=1, keepdims=True), 1e-30)
+    cy = np.hypot(rot[:, i, i], rot[:, j, i])
+    eul1 = np.empty((len(rot), 3))
+    eul1[:, i] = np.arctan2(rot[:, k, j], rot[:, k, k])
+    eul1[:, j] = np.arctan2(-rot[:, k, i], cy)
+    eul1[:, k] = np.arctan2(rot[:, j, i], rot[:, i, i])
+    eul2 = np.empty_like(eul1)
+    eul2[:, i] = np.arctan2(-rot[:, k, j], -rot[:, k, k])
+    eul2[:, j] = np.arctan2(-rot[:, k, i], -cy)
+    eul2[:, k] = np.arctan2(-rot[:, j, i], -rot[:, i, i])
+    # Gimbal lock, both solutions collapse to one with no rotation around the last axis
+    degenerate = cy <= 16.0 * np.finfo(np.float32).eps
+    eul1[degenerate, i] = np.arctan2(-rot[degenerate, j, k], rot[degenerate, j, j])
+    eul1[degenerate, k] = 0.0
+    eul2[degenerate] = eul1[degenerate]
+    if parity:
+        eul1, eul2 = -eul1, -eul2
+    use_second = np.abs(eul2).sum(axis=1) < np.abs(eul1).sum(axis=1)
+    return np.where(use_second[:, None], eul2, eul1)
+
+
+def make_eulers_compatible(eulers, previous):
+    """Winds (N, 3) eulers by whole turns per axis to the equivalent nearest to the previous (N, 3) values."""
+    return eulers - np.round((eulers - previous) / (2.0 * np.pi)) * (2.0 * np.pi)
+
+
+def compute_parent_space_matrices(matrices, parent_indices):
+    """Computes parent.matrix.inverted_safe() @ bone.matrix for every bone at once, root bones are returned as-is."""
+    result = matrices.copy()
+    has_parent = parent_indices >= 0
+    result[has_parent] = invert_safe(matrices[parent_indices[has_parent]]) @ matrices[has_parent]
+    return result
+
+
+def parent_space_transforms(matrices, parent_indices):
+    """
+    Returns the parent space translations (N, 3) and XYZ euler rotations in degrees (N, 3) of
+    armature space pose matrices, the values CopyPoseBoneTransforms puts on the clipboard.
+    """
+    local = compute_parent_space_matrices(matrices, parent_indices)
+    return local[:, :3, 3].copy(), np.degrees(matrices_to_euler(local))
+# ----------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+def get_hierarchy_levels(parent_indices):
+    """Groups bone indices by depth, so that every level only depends on the levels before it."""
+    depth = np.zeros(len(parent_indices), dtype=np.int64)
+    ancestor = parent_indices.copy()
+    pending = ancestor >= 0
+    while pending.any():
+        depth[pending] += 1
+        ancestor[pending] = parent_indices[ancestor[pending]]
+        pending = ancestor >= 0
+    return [np.flatnonzero(depth == level) for level in range(depth.max() + 1)] if len(depth) else []
+
+
+def compute_rest_offsets(rest, parent_indices):
+    """Rest matrix of every bone relative to the rest matrix of its parent, root bones keep their own rest matrix."""
+    offsets = rest.copy()
+    has_parent = parent_indices >= 0
+    offsets[has_parent] = invert_safe(rest[parent_indices[has_parent]]) @ rest[has_parent]
+    return offsets
+
+
+def pose_to_basis(pose, rest, parent_indices):
+    """
+    Computes the matrix_basis that reproduces the given armature space pose matrices, which is
+    what visual_transform_apply does for constrained bones. Like compute_direct_basis it assumes Blender's
+    default inheritance: every bone inherits the full transform of its parent and uses a local location.
+    """
+    offsets = compute_rest_offsets(rest, parent_indices)
+    has_parent = parent_indices >= 0
+    space = offsets.copy()
+    space[has_parent] = pose[parent_indices[has_parent]] @ offsets[has_parent]
+    return invert_safe(space) @ pose
+
+
+def apply_constraint_matrices(owner, target, constraint_type):
+    """
+    Reproduces the result of a world space COPY_* constraint for (N, 4, 4) arrays of owner and target matrices.
+    Rotation and scale are separated by normalizing the matrix axes, as Blender does when copying them.
+    """
+    if constraint_type == 'COPY_TRANSFORMS':
+        return target.copy()
+    result = owner.copy()
+    if constraint_type == 'COPY_LOCATION':
+        result[:, :3, 3] = target[:, :3, 3]
+        return result
+    owner_scale = np.linalg.norm(owner[:, :3, :3], axis=1)
+    target_scale = np.linalg.norm(target[:, :3, :3], axis=1)
+    if constraint_type == 'COPY_ROTATION':
+        axes = target[:, :3, :3] / np.maximum(target_scale, 1e-30)[:, None, :]
+        result[:, :3, :3] = axes * owner_scale[:, None, :]
+    elif constraint_type == 'COPY_SCALE':
+        axes = owner[:, :3, :3] / np.maximum(owner_scale, 1e-30)[:, None, :]
+        result[:, :3, :3] = axes * target_scale[:, None, :]
+    return result
+
+
+def compute_direct_basis(basis, rest, parent_indices, source, matched, constraint_type):
+    """
+    Computes the matrix_basis each bone needs so that its pose matches the result of
+    constraining the matched bones to the source matrices and applying the visual transform.
+    Bones are processed level by level (parents before children), so that every child is
+    evaluated against the already updated pose of its parent. Assumes Blender's default inheritance
+    (every bone inherits the full transform of its parent and uses a local location), which imported
+    Source rigs have, and no constraints on the bones besides the ones being reproduced.
+    """
+    pose = np.empty_like(basis)
+    new_basis = basis.copy()
+    rest_offset = compute_rest_offsets(rest, parent_indices)
+    for level in get_hierarchy_levels(parent_indices):
+        parents = parent_indices[level]
+        parent_pose = np.where((parents >= 0)[:, None, None], pose[parents], np.identity(4))
+        space = parent_pose @ rest_offset[level]
+        current = space @ basis[level]
+        level_matched = matched[level]
+        if level_matched.any():
+            current[level_matched] = apply_constraint_matrices(current[level_matched], source[level[level_matched]], constraint_type)
+            new_basis[level[level_matched]] = invert_safe(space[level_matched]) @ current[level_matched]
+        pose[level] = current
+    return new_basis
+
+
+def find_changed_bones(names, matrices, previous_index, previous):
+    """
+    Compares the matrices of the named bones with the ones recorded by a previous run, previous_index
+    mapping the recorded names to their rows in previous. Returns a bool mask of the bones whose
+    matrix changed or that were not recorded.
+    """
+    rows = np.array([previous_index.get(name, -1) for name in names], dtype=np.int64)
+    changed = rows < 0
+    known = ~changed
+    changed[known] = np.any(previous[rows[known]] != matrices[known], axis=(1, 2))
+    return changed
+
+
+def propagate_to_descendants(mask, parent_indices):
+    """Returns a copy of the bool bone mask that also holds every descendant of the bones in it."""
+    result = mask.copy()
+    for level in get_hierarchy_levels(parent_indices)[1:]:
+        result[level] |= result[parent_indices[level]]
+    return result
+# ----------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+def decompose_matrices(matrices):
+    """
+    Splits (N, 4, 4) matrices into locations (N, 3), rotation matrices (N, 3, 3) and scales (N, 3), like
+    mathutils Matrix.decompose(). Mirroring matrices are stored as negative scales on all three axes, like
+    Matrix.to_scale() does, so that the rotation stays a proper rotation.
+    """
+    scales = np.linalg.norm(matrices[:, :3, :3], axis=1)
+    scales[np.linalg.det(matrices[:, :3, :3]) < 0.0] *= -1.0
+    rotations = matrices[:, :3, :3] / np.where(scales == 0.0, 1.0, scales)[:, None, :]
+    return matrices[:, :3, 3].copy(), rotations, scales
+
+
+def matrices_to_quaternions(matrices):
+    """
+    Returns (N, 4) unit quaternions (w, x, y, z), with w >= 0, of the normalized rotation part of a (N, 4, 4) array.
+    Uses Shepperd's method: the largest component is taken from the diagonal and the others from the sums and
+    differences of the off-diagonal elements divided by it, which stays accurate for rotations close to 180 degrees.
+    """
+    rot = matrices[:, :3, :3]
+    rot = rot / np.maximum(np.linalg.norm(rot, axis=1, keepdims=True), 1e-30)
+    r00, r11, r22 = rot[:, 0, 0], rot[:, 1, 1], rot[:, 2, 2]
+    sx, sy, sz = rot[:, 2, 1] + rot[:, 1, 2], rot[:, 0, 2] + rot[:, 2, 0], rot[:, 1, 0] + rot[:, 0, 1]
+    dx, dy, dz = rot[:, 2, 1] - rot[:, 1, 2], rot[:, 0, 2] - rot[:, 2, 0], rot[:, 1, 0] - rot[:, 0, 1]
+    # Row k holds 4 * q[k] * q, the diagonal entries 4 * q[k] ** 2
+    candidates = np.stack([
+        np.stack([1.0 + r00 + r11 + r22, dx, dy, dz], axis=1),
+        np.stack([dx, 1.0 + r00 - r11 - r22, sz, sy], axis=1),
+        np.stack([dy, sz, 1.0 - r00 + r11 - r22, sx], axis=1),
+        np.stack([dz, sy, sx, 1.0 - r00 - r11 + r22], axis=1),
+    ], axis=1)
+    largest = np.argmax(np.diagonal(candidates, axis1=1, axis2=2), axis=1)
+    quaternions = candidates[np.arange(len(rot)), largest]
+    quaternions[quaternions[:, 0] < 0.0] *= -1.0
+    return quaternions / np.linalg.norm(quaternions, axis=1, keepdims=True)
+
+
+def make_quaternions_continuous(quaternions):
+    """Flips the sign of quaternions in a (F, ..., 4) frame sequence, so that every frame takes the short way from the previous one."""
+    result = quaternions.copy()
+    for frame in range(1, len(result)):
+        flip = (result[frame] * result[frame - 1]).sum(axis=-1) < 0.0
+        result[frame][flip] *= -1.0
+    return result
+
+
+def decompose_basis_sequence(basis, rotation_modes=None):
+    """
+    Splits a (F, N, 4, 4) sequence of matrix_basis values into keyframe channels: locations (F, N, 3),
+    quaternions (F, N, 4), eulers (F, N, 3) in radians and scales (F, N, 3). The eulers of every bone
+    are in the order of its rotation mode from rotation_modes (XYZ for other modes or without rotation_modes).
+    The matrices are split like basis_to_channels does it (see decompose_matrices). Quaternions and eulers
+    are made continuous over the frames, so that the baked F-Curves don't flip.
+    """
+    frame_count, bone_count = basis.shape[:2]
+    locations, rotations, scales = decompose_matrices(basis.reshape(-1, 4, 4))
+    quaternions = make_quaternions_continuous(matrices_to_quaternions(rotations).reshape(frame_count, -1, 4))
+    rotations = rotations.reshape(frame_count, bone_count, 3, 3)
+    orders = np.array([mode if mode in EULER_ORDERS else 'XYZ' for mode in rotation_modes or ['XYZ'] * bone_count])
+    eulers = np.empty((frame_count, bone_count, 3))
+    for order in set(orders.tolist()):
+        columns = orders == order
+        eulers[:, columns] = matrices_to_euler(rotations[:, columns].reshape(-1, 3, 3), order).reshape(frame_count, -1, 3)
+    eulers = np.unwrap(eulers, axis=0)
+    return locations.reshape(frame_count, -1, 3), quaternions, eulers, scales.reshape(frame_count, -1, 3)
+
+
+def quaternions_to_axis_angle(quaternions):
+    """Returns the (N, 4) axis angle rotations (angle, x, y, z), as Blender stores them, of (N, 4) unit quaternions."""
+    half_angles = np.arccos(np.clip(quaternions[:, 0], -1.0, 1.0))
+    sines = np.sin(half_angles)
+    # Like Blender, a rotation without an axis gets the Y axis
+    no_axis = np.abs(sines) < np.finfo(np.float32).eps
+    axes = quaternions[:, 1:] / np.where(no_axis, 1.0, sines)[:, None]
+    axes[no_axis] = (0.0, 1.0, 0.0)
+    return np.concatenate([2.0 * half_angles[:, None], axes], axis=1)
+
+
+def basis_to_channels(basis, rotation_modes, current):
+    """
+    Splits (N, 4, 4) matrix_basis values into the location, rotation and scale channels Blender stores
+    them in. rotation_modes holds the rotation_mode of every bone and current maps 'rotation_quaternion' (N, 4),
+    'rotation_euler' (N, 3) and 'rotation_axis_angle' (N, 4) to the current values of the bones. Only the
+    channel of each bone's rotation mode is replaced; quaternions stay in the hemisphere of the current
+    one and eulers are wound to the equivalent nearest to the current one, so that curves on them don't jump.
+    Returns a dict of 'location' (N, 3), 'scale' (N, 3) and the three rotation channels.
+    """
+    modes = np.asarray(rotation_modes)
+    locations, rotations, scales = decompose_matrices(basis)
+    quaternions = matrices_to_quaternions(rotations)
+    axis_angles = quaternions_to_axis_angle(quaternions)
+    quaternions[(quaternions * current['rotation_quaternion']).sum(axis=1) < 0.0] *= -1.0
+    eulers = np.array(current['rotation_euler'], dtype=np.float64)
+    for order in set(rotation_modes) & set(EULER_ORDERS):
+        rows = modes == order
+        eulers[rows] = make_eulers_compatible(matrices_to_euler(rotations[rows], order), eulers[rows])
+    return {
+        'location': locations,
+        'rotation_quaternion': np.where((modes == 'QUATERNION')[:, None], quaternions, current['rotation_quaternion']),
+        'rotation_euler': eulers,
+        'rotation_axis_angle': np.where((modes == 'AXIS_ANGLE')[:, None], axis_angles, current['rotation_axis_angle']),
+        'scale': scales,
+    }
+# ----------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+def quaternions_to_matrices(quaternions):
+    """Returns the (N, 3, 3) rotation matrices of (N, 4) unit quaternions (w, x, y, z)."""
+    w, x, y, z = quaternions.T
+    return np.stack([
+        np.stack([1.0 - 2.0 * (y * y + z * z), 2.0 * (x * y - w * z), 2.0 * (x * z + w * y)], axis=1),
+        np.stack([2.0 * (x * y + w * z), 1.0 - 2.0 * (x * x + z * z), 2.0 * (y * z - w * x)], axis=1),
+        np.stack([2.0 * (x * z - w * y), 2.0 * (y * z + w * x), 1.0 - 2.0 * (x * x + y * y)], axis=1),
+    ], axis=1)
+
+
+def blend_matrices(matrices, weights):
+    """
+    Blends an (S, N, 4, 4) stack of matrices from S sources with an (S, N) array of weights, 0 where
+    a source has no matrix for a bone. Weights are normalized per bone. Locations and scales are
+    blended linearly, rotations as a weighted sum of quaternions, each one flipped into the hemisphere
+    of the bone's heaviest source so that opposite signs of the same rotation don't cancel out.
+    Returns the (N, 4, 4) blended matrices and a bool mask of the bones any source has a weight for.
+    """
+    source_count, bone_count = weights.shape
+    total = weights.sum(axis=0)
+    blended = total > 0.0
+    weights = np.divide(weights, total, out=np.zeros_like(weights), where=blended)
+
+    source_locations, rotations, source_scales = decompose_matrices(matrices.reshape(-1, 4, 4))
+    locations = np.einsum('sn,sni->ni', weights, source_locations.reshape(source_count, bone_count, 3))
+    scales = np.einsum('sn,sni->ni', weights, source_scales.reshape(source_count, bone_count, 3))
+    quaternions = matrices_to_quaternions(rotations).reshape(source_count, bone_count, 4)
+    reference = quaternions[np.argmax(weights, axis=0), np.arange(bone_count)]
+    signs = np.where((quaternions * reference).sum(axis=-1) < 0.0, -1.0, 1.0)
+    quaternion = np.einsum('sn,sni->ni', weights * signs, quaternions)
+    quaternion[~blended] = (1.0, 0.0, 0.0, 0.0)
+    quaternion /= np.maximum(np.linalg.norm(quaternion, axis=1, keepdims=True), 1e-30)
+
+    result = np.tile(np.identity(4), (bone_count, 1, 1))
+    result[:, :3, :3] = quaternions_to_matrices(quaternion) * scales[:, None, :]
+    result[:, :3, 3] = locations
+    result[~blended] = np.identity(4)
+    return result, blended
+# ----------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+SNAPSHOT_VERSION = 1
+SNAPSHOT_ARRAYS = ('names', 'parents', 'matrices', 'matrix_world')
+
+
+def save_pose_snapshot(path, names, parent_indices, matrices, matrix_world):
+    """
+    Writes a pose snapshot of an armature: its bone names, parent indices (-1 for root bones), armature
+    space pose matrices and world matrix. The file is an uncompressed .npz, so loading it back is one
+    bulk read per array, and parent space matrices can be derived with compute_parent_space_matrices.
+    """
+    np.savez(path, version=np.array(SNAPSHOT_VERSION), names=np.array(names, dtype=str),
+             parents=np.asarray(parent_indices, dtype=np.int32), matrices=np.asarray(matrices, dtype=np.float32),
+             matrix_world=np.asarray(matrix_world, dtype=np.float64))
+
+
+def load_pose_snapshot(path):
+    """
+    Reads a pose snapshot written by save_pose_snapshot. Returns a dict holding the names as a list and the
+    parents, matrices (N, 4, 4) and matrix_world arrays. Raises ValueError for files that are not pose snapshots.
+    """
+    try:
+        data = np.load(path)
+        # A plain .npy file loads as a single array
+        if not isinstance(data, np.lib.npyio.NpzFile):
+            raise ValueError("not an .npz archive")
+        with data:
+            version = int(data['version'])
+            snapshot = {key: data[key] for key in SNAPSHOT_ARRAYS}
+    except (OSError, KeyError, ValueError, TypeError, zipfile.BadZipFile) as error:
+        raise ValueError("Not a pose snapshot: {} ({})".format(path, error))
+    if version > SNAPSHOT_VERSION:
+        raise ValueError("Pose snapshot {} was written by a newer version of the addon".format(path))
+    snapshot['names'] = snapshot['names'].tolist()
+    snapshot['matrices'] = snapshot['matrices'].astype(np.float64)
+    return snapshot
+# ----------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+# Bone names are compared as lowercase parts, without the ValveBiped.Bip01 prefix and with the side marker moved to the end
+_NAME_PREFIX = re.compile(r'^(?:valvebiped[._ ])?(?:bip0?1[._ ]?)?')
+_NAME_SEPARATORS = re.compile(r'[\s._\-]+')
+_SIDE_WORDS = {'left': 'l', 'right': 'r'}
+
+
+def normalize_bone_name(name):
+    """
+    Returns a case, separator and side marker insensitive key for a bone name,
+    e.g. 'ValveBiped.Bip01_L_UpperArm', 'UpperArm.L' and 'upperarm_left' all give 'upperarm_l'.
+    """
+    parts = [_SIDE_WORDS.get(part, part) for part in _NAME_SEPARATORS.split(_NAME_PREFIX.sub('', name.lower())) if part]
+    sides = [part for part in parts if part in ('l', 'r')]
+    if len(sides) == 1:
+        parts.remove(sides[0])
+        parts.append(sides[0])
+    return '_'.join(parts)
+
+
+def parse_name_rules(text):
+    """
+    Parses rename rules separated by ';' or new lines: 'old=new' renames a bone name and
+    're:pattern=replacement' applies a regular expression substitution, in the given order.
+    Returns a list of (pattern, replacement) with the regular expressions compiled, raises ValueError on invalid rules.
+    """
+    rules = []
+    for rule in re.split(r'[;\n]', text):
+        rule = rule.strip()
+        if not rule:
+            continue
+        pattern, separator, replacement = rule.partition('=')
+        if not separator:
+            raise ValueError("Invalid rename rule '{}', expected 'old=new' or 're:pattern=replacement'".format(rule))
+        if pattern.startswith('re:'):
+            try:
+                rules.append((re.compile(pattern[3:].strip()), replacement.strip()))
+            except re.error as error:
+                raise ValueError("Invalid regular expression in rename rule '{}': {}".format(rule, error))
+        else:
+            rules.append((pattern.strip(), replacement.strip()))
+    return rules
+
+
+def map_bone_name(name, rules, normalize):
+    """Applies the parsed rename rules to a bone name, followed by normalize_bone_name if requested."""
+    for pattern, replacement in rules:
+        if isinstance(pattern, str):
+            if name == pattern:
+                name = replacement
+        else:
+            name = pattern.sub(replacement, name)
+    return normalize_bone_name(name) if normalize else name
+
+
+def build_name_table(source_names, target_names, rules=(), normalize=False):
+    """
+    Maps target bone names to source bone names for bones that don't share the exact same name.
+    Both sides are mapped through the rules (and normalization) and matched on the result; identical
+    names always match each other and need no entry. The first source bone wins when several map to the same name.
+    """
+    source_set = set(source_names)
+    source_keys = {}
+    for name in source_names:
+        source_keys.setdefault(map_bone_name(name, rules, normalize), name)
+
+    table = {}
+    for name in target_names:
+        if name in source_set:
+            continue
+        source_name = source_keys.get(map_bone_name(name, rules, normalize))
+        if source_name is not None:
+            table[name] = source_name
+    return table
+# ----------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
@@ -1,5 +1,23 @@
 import bpy
 import math
+import time
+import numpy as np
+from collections import OrderedDict
+from contextlib import contextmanager
+# Installed from the zip (see build_addon.py) the addon is a package holding pose_bone_math,
+# imported from the repository or a scripts folder both are top-level modules
+if __package__:
+    from .pose_bone_math import (basis_to_channels, build_name_table, change_space, compute_direct_basis, decompose_basis_sequence,
+                                 find_changed_bones, format_vector, blend_matrices, load_pose_snapshot, matrices_from_flat,
+                                 parent_indices_from_names, parent_space_transforms, parse_name_rules,
+                                 pose_to_basis, propagate_to_descendants, quaternions_to_axis_angle, save_pose_snapshot)
+else:
+    from pose_bone_math import (basis_to_channels, build_name_table, change_space, compute_direct_basis, decompose_basis_sequence,
+                                find_changed_bones, format_vector, blend_matrices, load_pose_snapshot, matrices_from_flat,
+                                parent_indices_from_names, parent_space_transforms, parse_name_rules,
+                                pose_to_basis, propagate_to_descendants, quaternions_to_axis_angle, save_pose_snapshot)
+from bpy.app.handlers import persistent
+from bpy_extras.io_utils import ExportHelper
 # ----------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
 bl_info = {
     "name": "Pose Bone Transforms",
@@ -12,6 +30,809 @@ bl_info = {
     "category": "Animation",
 }
 # ----------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+def build_bone_index(pose_bones):
+    """
+    Maps bone names to pose bones. Built once per armature so that matching
+    becomes a single dictionary lookup per bone instead of a scan of the other armature.
+    """
+    return {bone.name: bone for bone in pose_bones}
+
+
+def match_bones(source_index, target_bones, name_table=None):
+    """
+    Pairs each target bone with the source bone of the same name, or of the name given by the
+    name table (see get_name_table) for target bones whose names differ from the source's.
+    Returns the matched (source_bone, target_bone) pairs, followed by the names of the
+    source bones and target bones that found no counterpart.
+    """
+    matched = []
+    unmatched_target = []
+    for target_bone in target_bones:
+        name = name_table.get(target_bone.name, target_bone.name) if name_table else target_bone.name
+        bone = source_index.get(name)
+        if bone is None:
+            unmatched_target.append(target_bone.name)
+        else:
+            matched.append((bone, target_bone))
+    matched_names = {bone.name for bone, _ in matched}
+    unmatched_source = [name for name in source_index if name not in matched_names]
+    return matched, unmatched_source, unmatched_target
+
+
+# Name tables per (source, target, rules, normalize), reused for as long as the bone names of both armatures stay the same
+# Least recently used name tables, at most NAME_TABLE_CACHE_SIZE of them
+_name_table_cache = OrderedDict()
+NAME_TABLE_CACHE_SIZE = 32
+
+
+def get_cached_name_table(source_key, source_names, target_armature, name_rules='', normalize_names=False):
+    """
+    Returns the target -> source name table for mapped matching against the given source bone names, or None
+    when no mapping is requested. source_key identifies the source (an armature or snapshot file) in the cache.
+    The rules are compiled and the names mapped only when the pair is new or the bone names changed.
+    """
+    if not name_rules.strip() and not normalize_names:
+        return None
+    source_names = tuple(source_names)
+    target_names = tuple([bone.name for bone in target_armature.pose.bones])
+    key = (source_key, target_armature.name, name_rules, normalize_names)
+    signature = hash((source_names, target_names))
+    cached = _name_table_cache.get(key)
+    if cached is None or cached[0] != signature:
+        cached = _name_table_cache[key] = (signature, build_name_table(source_names, target_names, parse_name_rules(name_rules), normalize_names))
+        if len(_name_table_cache) > NAME_TABLE_CACHE_SIZE:
+            _name_table_cache.popitem(last=False)
+    _name_table_cache.move_to_end(key)
+    return cached[1]
+
+
+def get_name_table(source_armature, target_armature, name_rules='', normalize_names=False):
+    """Returns the target -> source name table of two armatures, see get_cached_name_table."""
+    source_names = [bone.name for bone in source_armature.pose.bones]
+    return get_cached_name_table(('ARMATURE', source_armature.name), source_names, target_armature, name_rules, normalize_names)
+
+
+def get_pose_matrices(armature, attribute='matrix'):
+    """
+    Reads a matrix attribute ('matrix' or 'matrix_basis') of every pose bone in one foreach_get call.
+    Returns a float64 array of shape (N, 4, 4) in the order of armature.pose.bones.
+    """
+    bones = armature.pose.bones
+    flat = np.empty(len(bones) * 16, dtype=np.float32)
+    bones.foreach_get(attribute, flat)
+    return matrices_from_flat(flat)
+
+
+BASIS_CHANNELS = (('location', 3), ('rotation_quaternion', 4), ('rotation_euler', 3), ('rotation_axis_angle', 4), ('scale', 3))
+
+
+def set_pose_basis(armature, basis, rows):
+    """
+    Writes matrix_basis of the pose bones at the given indices from a (N, 4, 4) array. The location, rotation
+    and scale channels of every bone are read in bulk, only the given rows are replaced (see basis_to_channels)
+    and the channels are written back, so all other bones keep their values exactly. The armature is tagged
+    for re-evaluation, foreach_set alone doesn't do it and the next scene update would keep the old pose.
+    """
+    if not len(rows):
+        return
+    bones = armature.pose.bones
+    channels = {}
+    for attribute, size in BASIS_CHANNELS:
+        channels[attribute] = np.empty((len(bones), size), dtype=np.float32)
+        bones.foreach_get(attribute, channels[attribute].ravel())
+    current = {attribute: channels[attribute][rows] for attribute, _ in BASIS_CHANNELS}
+    new_channels = basis_to_channels(basis[rows], [bones[int(i)].rotation_mode for i in rows], current)
+    for attribute, _ in BASIS_CHANNELS:
+        channels[attribute][rows] = new_channels[attribute]
+        bones.foreach_set(attribute, channels[attribute].ravel())
+    armature.update_tag()
+
+
+def get_rest_matrices(armature):
+    """Reads bone.matrix_local (armature space rest pose) of every bone, in the order of armature.pose.bones."""
+    bones = armature.data.bones
+    flat = np.empty(len(bones) * 16, dtype=np.float32)
+    bones.foreach_get('matrix_local', flat)
+    matrices = matrices_from_flat(flat)
+    index = {bone.name: i for i, bone in enumerate(bones)}
+    return matrices[[index[bone.name] for bone in armature.pose.bones]]
+
+
+def get_parent_indices(armature):
+    """Returns an int array holding the index of each pose bone's parent, or -1 for root bones."""
+    bones = armature.pose.bones
+    return parent_indices_from_names([bone.name for bone in bones], [bone.parent.name if bone.parent else None for bone in bones])
+
+
+def get_parent_space_transforms(armature):
+    """
+    Batch version of CopyPoseBoneTransforms for a whole armature.
+    Returns the bone names, a (N, 3) array of parent space translations and a (N, 3) array
+    of parent space XYZ euler rotations in degrees, all in the order of armature.pose.bones.
+    """
+    names = [bone.name for bone in armature.pose.bones]
+    translations, rotations = parent_space_transforms(get_pose_matrices(armature), get_parent_indices(armature))
+    return names, translations, rotations
+
+
+def get_matched_indices(target_armature, source_armature, matched_bones):
+    """Returns the indices of the matched target bones and of their source bones in the pose.bones of their armature."""
+    target_index = {bone.name: i for i, bone in enumerate(target_armature.pose.bones)}
+    source_index = {bone.name: i for i, bone in enumerate(source_armature.pose.bones)}
+    rows = [target_index[target_bone.name] for _, target_bone in matched_bones]
+    cols = [source_index[bone.name] for bone, _ in matched_bones]
+    return rows, cols
+
+
+def has_custom_inheritance(bone):
+    """
+    True for a bone that doesn't inherit the full transform of its parent or doesn't use a local location,
+    neither of which pose_to_basis and compute_direct_basis reproduce.
+    """
+    if hasattr(bone, 'inherit_scale'):
+        inherit_scale = bone.inherit_scale
+    else:
+        # Blender 2.80 only has the use_inherit_scale toggle, later versions removed it
+        inherit_scale = 'FULL' if bone.use_inherit_scale else 'NONE'
+    return not bone.use_local_location or (bone.parent is not None and (not bone.use_inherit_rotation or inherit_scale != 'FULL'))
+
+
+def get_custom_inheritance_rows(armature, rows):
+    """Returns the indices among rows of the pose bones with custom inheritance, see has_custom_inheritance."""
+    bones = armature.pose.bones
+    return [int(i) for i in rows if has_custom_inheritance(bones[int(i)].bone)]
+
+
+def check_direct_apply(armature, sources=(), constraint_type=None, matched_names=(), cleared_names=()):
+    """
+    Raises ValueError when the direct engine can't reproduce the constraint result on the armature. It assumes
+    every bone inherits the full transform of its parent (see has_custom_inheritance) and carries no constraints
+    besides the COPY_* constraints targeting one of sources that the run removes anyway: those of constraint_type
+    on the matched bones (matched_names), which the transfer replaces, and all of them on the bones in cleared_names,
+    which Clear Previous removes before the transfer. The caller removes them with clear_constraints.
+    """
+    for bone in armature.pose.bones:
+        if has_custom_inheritance(bone.bone):
+            raise ValueError(f"Direct Apply needs bones that fully inherit their parent's transform, '{bone.name}' doesn't. Turn off Direct Apply.")
+        for constraint in bone.constraints:
+            if constraint.type in COPY_CONSTRAINT_TYPES and constraint.target in sources:
+                if bone.name in cleared_names or (constraint.type == constraint_type and bone.name in matched_names):
+                    continue
+            hint = "Enable Clear Previous or turn off Direct Apply" if constraint.target in sources else "Turn off Direct Apply"
+            raise ValueError(f"Direct Apply can't evaluate the {constraint.type} constraint of '{bone.name}'. {hint}.")
+
+
+def get_visual_basis(armature, rest, parent_indices, custom_rows=()):
+    """
+    Returns the (N, 4, 4) matrix_basis reproducing the evaluated pose of every bone, as the visual transform
+    computes it. pose_to_basis assumes full inheritance, so the bones at custom_rows (see
+    get_custom_inheritance_rows) are converted one by one with Object.convert_space instead.
+    """
+    basis = pose_to_basis(get_pose_matrices(armature), rest, parent_indices)
+    bones = armature.pose.bones
+    for i in custom_rows:
+        bone = bones[i]
+        basis[i] = np.array(armature.convert_space(pose_bone=bone, matrix=bone.matrix, from_space='POSE', to_space='LOCAL'))
+    return basis
+
+
+# Source matrices last applied by the direct engine per (target, source, constraint type) and the target's matrix_basis
+# they resulted in, as (name to row index, source matrices, target basis).
+# Cleared on undo, redo and file load, since those can bring back a target pose they were not applied to.
+_applied_sources = {}
+
+
+def forget_applied_sources(target_armature):
+    """Drops the source matrices recorded for the target armature, every engine calls it when it writes the target's pose."""
+    for key in [key for key in _applied_sources if key[0] == target_armature.name]:
+        del _applied_sources[key]
+
+
+def apply_proportions_direct(target_armature, source_armature, matched_bones, constraint_type, incremental=False):
+    """
+    Direct engine of ApplyCopyTransformsConstraints: writes the visual result of the constraints
+    straight to matrix_basis of the target bones without creating any constraints.
+    With incremental, only the bones whose source matrix changed since the last direct apply of
+    the same armatures, or whose target basis was edited since, and the matched bones below them,
+    are re-applied.
+    Returns the number of re-applied bones.
+    """
+    rows, cols = get_matched_indices(target_armature, source_armature, matched_bones)
+    basis = get_pose_matrices(target_armature, 'matrix_basis')
+    parent_indices = get_parent_indices(target_armature)
+    # Constraints work in world space, bring the source pose into the target's armature space
+    source = np.empty_like(basis)
+    source[rows] = change_space(get_pose_matrices(source_armature)[cols], source_armature.matrix_world, target_armature.matrix_world)
+
+    matched = np.zeros(len(basis), dtype=bool)
+    matched[rows] = True
+    names = [target_bone.name for _, target_bone in matched_bones]
+    key = (target_armature.name, source_armature.name, constraint_type)
+    previous = _applied_sources.get(key)
+    # Whatever was recorded for other sources or constraint types no longer describes the target's pose
+    forget_applied_sources(target_armature)
+    if incremental and previous is not None:
+        # Children are posed relative to their parents, so a changed bone re-applies the matched bones below it too
+        previous_index, previous_source, previous_basis = previous
+        changed = np.zeros_like(matched)
+        changed[rows] = (find_changed_bones(names, source[rows], previous_index, previous_source) |
+                         find_changed_bones(names, basis[rows], previous_index, previous_basis))
+        matched &= propagate_to_descendants(changed, parent_indices)
+
+    if matched.any():
+        new_basis = compute_direct_basis(basis, get_rest_matrices(target_armature), parent_indices, source, matched, constraint_type)
+        set_pose_basis(target_armature, new_basis, np.flatnonzero(matched))
+        # Read back as stored by the channels, so that an untouched bone compares equal next time
+        basis = get_pose_matrices(target_armature, 'matrix_basis')
+    _applied_sources[key] = ({name: i for i, name in enumerate(names)}, source[rows], basis[rows])
+    return int(matched.sum())
+
+
+def apply_blend_direct(target_armature, sources, constraint_type):
+    """
+    Direct engine for several weighted sources, given as (source_armature, weight, matched_bones).
+    The source matrices of every bone are blended (see blend_matrices) and the visual result of
+    constraining the target bones to the blend is written to matrix_basis in a single pass.
+    Returns the number of blended bones.
+    """
+    basis = get_pose_matrices(target_armature, 'matrix_basis')
+    matrices = np.zeros((len(sources),) + basis.shape)
+    weights = np.zeros((len(sources), len(basis)))
+    for i, (source_armature, weight, matched_bones) in enumerate(sources):
+        rows, cols = get_matched_indices(target_armature, source_armature, matched_bones)
+        matrices[i, rows] = change_space(get_pose_matrices(source_armature)[cols], source_armature.matrix_world, target_armature.matrix_world)
+        weights[i, rows] = weight
+
+    source, matched = blend_matrices(matrices, weights)
+    forget_applied_sources(target_armature)
+    new_basis = compute_direct_basis(basis, get_rest_matrices(target_armature), get_parent_indices(target_armature),
+                                     source, matched, constraint_type)
+    set_pose_basis(target_armature, new_basis, np.flatnonzero(matched))
+    return int(matched.sum())
+
+
+def apply_snapshot_direct(target_armature, snapshot, rows, cols, constraint_type):
+    """
+    Direct engine with the source pose read from a pose snapshot (see load_pose_snapshot) instead of
+    a source armature: target bone rows are constrained to the snapshot matrices at cols.
+    """
+    basis = get_pose_matrices(target_armature, 'matrix_basis')
+    matched = np.zeros(len(basis), dtype=bool)
+    matched[rows] = True
+    source = np.empty_like(basis)
+    source[rows] = change_space(snapshot['matrices'][cols], snapshot['matrix_world'], target_armature.matrix_world)
+
+    new_basis = compute_direct_basis(basis, get_rest_matrices(target_armature), get_parent_indices(target_armature),
+                                     source, matched, constraint_type)
+    forget_applied_sources(target_armature)
+    set_pose_basis(target_armature, new_basis, rows)
+
+
+def visual_transform_apply(armature, rows, evaluate=True):
+    """
+    Bulk replacement of bpy.ops.pose.visual_transform_apply for the pose bones at the given indices:
+    evaluates the scene once, reads the constrained pose in one call and writes back the matrix_basis
+    reproducing it (see get_visual_basis). Unlike the operator it needs neither Pose Mode nor a bone selection.
+    Pass evaluate=False when the scene was already evaluated after the constraints were set up.
+    """
+    if evaluate:
+        bpy.context.view_layer.update()
+    basis = get_visual_basis(armature, get_rest_matrices(armature), get_parent_indices(armature), get_custom_inheritance_rows(armature, rows))
+    forget_applied_sources(armature)
+    set_pose_basis(armature, basis, rows)
+
+
+def set_fcurve_keyframes(action, data_path, index, group, frames, values):
+    """
+    Replaces the keyframes of one F-Curve inside the frame range with the given values, adding them all
+    at once with keyframe_points.add and foreach_set. The F-Curve itself and its keyframes outside of
+    the range are kept as they are, with their interpolation, handles, modifiers and mute or lock state.
+    """
+    fcurve = action.fcurves.find(data_path, index=index)
+    if fcurve is None:
+        fcurve = action.fcurves.new(data_path, index=index, action_group=group)
+    points = fcurve.keyframe_points
+    co = np.empty(len(points) * 2, dtype=np.float32)
+    points.foreach_get('co', co)
+    replaced = np.flatnonzero((co[0::2] >= frames[0]) & (co[0::2] <= frames[-1]))
+    # Back to front, so that the indices of the keyframes still to remove don't shift
+    for i in reversed(replaced.tolist()):
+        points.remove(points[i], fast=True)
+
+    kept = len(points)
+    points.add(len(frames))
+    co = np.empty(len(points) * 2, dtype=np.float32)
+    points.foreach_get('co', co)
+    co[kept * 2:] = np.stack([frames, values], axis=1).ravel()
+    points.foreach_set('co', co)
+    # Sorts the new keyframes in and recalculates the handles
+    fcurve.update()
+
+
+def bake_keyframes(armature, bone_names, frames, basis):
+    """
+    Keys location, rotation and scale of the given bones from a (F, M, 4, 4) array of matrix_basis values,
+    writing every F-Curve in bulk instead of one keyframe_insert per bone and frame. Every bone is keyed
+    in its own rotation mode: quaternion, axis angle, or eulers in the bone's rotation order.
+    """
+    if armature.animation_data is None:
+        armature.animation_data_create()
+    action = armature.animation_data.action
+    if action is None:
+        action = armature.animation_data.action = bpy.data.actions.new(armature.name + "Action")
+
+    frames = np.asarray(frames, dtype=np.float64)
+    bones = [armature.pose.bones[name] for name in bone_names]
+    locations, quaternions, eulers, scales = decompose_basis_sequence(basis, [bone.rotation_mode for bone in bones])
+    for i, (name, bone) in enumerate(zip(bone_names, bones)):
+        if bone.rotation_mode == 'QUATERNION':
+            rotation = ('rotation_quaternion', quaternions[:, i])
+        elif bone.rotation_mode == 'AXIS_ANGLE':
+            rotation = ('rotation_axis_angle', quaternions_to_axis_angle(quaternions[:, i]))
+        else:
+            rotation = ('rotation_euler', eulers[:, i])
+        for attribute, values in (('location', locations[:, i]), rotation, ('scale', scales[:, i])):
+            data_path = bone.path_from_id(attribute)
+            for index in range(values.shape[1]):
+                set_fcurve_keyframes(action, data_path, index, name, frames, values[:, index])
+
+
+def bake_proportions(target_armature, source_armature, matched_bones, constraint_type, frames, direct):
+    """
+    Bakes the visual result of the proportions transfer on every frame into keyframes of the matched target bones.
+    Each frame is set once, then either the constrained pose of the target is read back in bulk, or the direct
+    engine computes it from the source pose. The keyframes of all frames are written together at the end.
+    """
+    scene = bpy.context.scene
+    rows, cols = get_matched_indices(target_armature, source_armature, matched_bones)
+    rest = get_rest_matrices(target_armature)
+    parent_indices = get_parent_indices(target_armature)
+    matched = np.zeros(len(rest), dtype=bool)
+    matched[rows] = True
+    custom_rows = [] if direct else get_custom_inheritance_rows(target_armature, rows)
+
+    baked = np.empty((len(frames), len(rows), 4, 4))
+    current_frame = scene.frame_current
+    for i, frame in enumerate(frames):
+        scene.frame_set(frame)
+        if direct:
+            basis = get_pose_matrices(target_armature, 'matrix_basis')
+            source = np.empty_like(basis)
+            source[rows] = change_space(get_pose_matrices(source_armature)[cols], source_armature.matrix_world, target_armature.matrix_world)
+            basis = compute_direct_basis(basis, rest, parent_indices, source, matched, constraint_type)
+        else:
+            basis = get_visual_basis(target_armature, rest, parent_indices, custom_rows)
+        baked[i] = basis[rows]
+
+    forget_applied_sources(target_armature)
+    bake_keyframes(target_armature, [target_bone.name for _, target_bone in matched_bones], frames, baked)
+    scene.frame_set(current_frame)
+
+
+COPY_CONSTRAINT_TYPES = frozenset(('COPY_ROTATION', 'COPY_LOCATION', 'COPY_SCALE', 'COPY_TRANSFORMS'))
+
+
+def clear_constraints(bones, source_armature):
+    """Removes the COPY_* constraints targeting the source armature from the given pose bones, returns how many were removed."""
+    removed = 0
+    for bone in bones:
+        constraints_to_remove = [c for c in bone.constraints if c.type in COPY_CONSTRAINT_TYPES and c.target == source_armature]
+        for constraint in constraints_to_remove:
+            bone.constraints.remove(constraint)
+        removed += len(constraints_to_remove)
+    return removed
+
+
+# Settings of a reused constraint that are set by reconcile_constraints or only affect the UI
+KEPT_CONSTRAINT_PROPERTIES = frozenset(('name', 'target', 'subtarget', 'active', 'show_expanded'))
+
+
+def get_new_constraint_settings(pose_bone, constraint_type):
+    """
+    Returns the writable settings of a newly created constraint of the given type, read from a temporary
+    constraint on the pose bone. Blender sets the starting values of a new constraint in C (e.g. influence
+    and use_x/y/z), they differ from the defaults in its RNA properties.
+    """
+    constraint = pose_bone.constraints.new(constraint_type)
+    settings = {}
+    for prop in constraint.bl_rna.properties:
+        if prop.is_readonly or prop.type in {'POINTER', 'COLLECTION'} or prop.identifier in KEPT_CONSTRAINT_PROPERTIES:
+            continue
+        value = getattr(constraint, prop.identifier)
+        if prop.type == 'ENUM' and prop.is_enum_flag:
+            value = set(value)
+        elif prop.type not in {'ENUM', 'STRING'} and prop.array_length:
+            value = tuple(value)
+        settings[prop.identifier] = value
+    pose_bone.constraints.remove(constraint)
+    return settings
+
+
+def reset_constraint(constraint, settings):
+    """Resets every writable setting of a constraint to the settings of a newly created one (see get_new_constraint_settings)."""
+    for identifier, value in settings.items():
+        setattr(constraint, identifier, value)
+
+
+def reconcile_constraints(target_bones, source_armature, matched_bones, constraint_type, clear_previous=False):
+    """
+    Brings the constraint stack of every target bone in line with its matched source bone, walking each stack once.
+    The first constraint of the requested type targeting the source armature is reused, its duplicates are
+    removed, and with clear_previous so are the other COPY_* constraints targeting the source armature.
+    A reused constraint gets every setting reset to those of a new one (see reset_constraint), but only when it's
+    the last one of the stack, otherwise it's replaced by a new one at the end, so results are the same as with new constraints.
+    Returns a dict with the number of created, reused and removed constraints.
+    """
+    subtargets = {target_bone.name: bone.name for bone, target_bone in matched_bones}
+    counts = {'created': 0, 'reused': 0, 'removed': 0}
+    # Read once per run, on the first bone that reuses a constraint
+    new_settings = None
+    for target_bone in target_bones:
+        subtarget = subtargets.get(target_bone.name)
+        if subtarget is None and not clear_previous:
+            continue
+
+        reusable = None
+        constraints_to_remove = []
+        constraints = target_bone.constraints
+        reusable_index = removed_after = 0
+        for i, constraint in enumerate(constraints):
+            if constraint.type not in COPY_CONSTRAINT_TYPES or constraint.target != source_armature:
+                continue
+            if subtarget is not None and constraint.type == constraint_type and reusable is None:
+                reusable = constraint
+                reusable_index = i
+            elif clear_previous or constraint.type == constraint_type:
+                constraints_to_remove.append(constraint)
+                removed_after += reusable is not None
+        if reusable is not None and removed_after != len(constraints) - 1 - reusable_index:
+            # A new constraint would be evaluated last, after the other constraints of the bone
+            constraints_to_remove.append(reusable)
+            reusable = None
+        for constraint in constraints_to_remove:
+            target_bone.constraints.remove(constraint)
+        counts['removed'] += len(constraints_to_remove)
+
+        if subtarget is None:
+            continue
+        if reusable is None:
+            reusable = target_bone.constraints.new(constraint_type)
+            reusable.target = source_armature
+            counts['created'] += 1
+        else:
+            if new_settings is None:
+                new_settings = get_new_constraint_settings(target_bone, constraint_type)
+            reset_constraint(reusable, new_settings)
+            counts['reused'] += 1
+        reusable.subtarget = subtarget
+    return counts
+
+
+PROFILE_STAGES = ('load', 'match', 'constraints', 'apply', 'cleanup', 'total')
+
+
+@contextmanager
+def profile_stage(profile, stage):
+    """Adds the milliseconds spent inside the with block to profile[stage], unless profile is None."""
+    start_time = time.perf_counter()
+    yield
+    if profile is not None:
+        profile[stage] = profile.get(stage, 0.0) + (time.perf_counter() - start_time) * 1000.0
+
+
+def format_profile(profile):
+    """Formats stage timings as one compact line, e.g. 'match 1.20 ms | constraints 3.41 ms | total 4.80 ms'."""
+    return ' | '.join('{} {:.2f} ms'.format(stage, profile[stage]) for stage in PROFILE_STAGES if stage in profile)
+
+
+def merge_results(results):
+    """Combines the summary dicts of runs on several target armatures into one, adding up their counts and timings."""
+    merged = dict(results[0])
+    # Bone indices only mean something for their own armature
+    merged.pop('rows', None)
+    for result in results[1:]:
+        for key in ('matched', 'match_time', 'created', 'reused', 'removed'):
+            merged[key] += result[key]
+        merged['unmatched_source'] = merged['unmatched_source'] + result['unmatched_source']
+        merged['unmatched_target'] = merged['unmatched_target'] + result['unmatched_target']
+    if merged['profile'] is not None:
+        merged['profile'] = {stage: sum(result['profile'].get(stage, 0.0) for result in results)
+                             for stage in PROFILE_STAGES if any(stage in result['profile'] for result in results)}
+    if len(results) > 1:
+        merged['message'] = f"{merged['message']} Applied to {len(results)} armatures."
+    return merged
+
+
+def apply_proportions(target_armature, source_armature, constraint_type='COPY_TRANSFORMS', apply_visual_transform=False,
+                      direct_apply=False, only_selected=False, clear_previous=False, bake_frames=None,
+                      name_rules='', normalize_names=False, incremental=False, profile_stages=False, source_index=None):
+    """
+    Copies transforms on matching bone names from the source armature to the target armature.
+    This is the work of ApplyCopyTransformsConstraints without the dialog, so that it can be
+    scripted (see pose_bone_batch.py). No other operators are called and the bone selection is
+    left untouched. Apart from baking, which evaluates every frame, only the constraint based
+    visual transform path evaluates the scene, once, to read the constrained pose. Evaluating
+    the result is left to the caller.
+    With apply_visual_transform, passing a list of frames as bake_frames bakes the result into
+    keyframes on every one of those frames instead of applying it to the current pose.
+    name_rules and normalize_names match bones whose names differ, see get_name_table.
+    With incremental, the direct path only re-applies the bones whose source changed since its
+    last run on the same armatures, see apply_proportions_direct. source_index reuses a bone index
+    of the source armature (see build_bone_index) built by the caller, e.g. once for several targets.
+    Raises ValueError for an empty bake_frames, for invalid name rules, and with Direct Apply for target
+    armatures the direct engine can't reproduce (see check_direct_apply).
+    Returns a summary dict with the report message, the unmatched bone names, the matching time
+    and the number of created, reused and removed constraints. 'rows' holds the indices of the matched
+    bones in target_armature.pose.bones. With profile_stages it also holds the milliseconds spent
+    in every stage of PROFILE_STAGES as 'profile', otherwise that is None.
+    """
+    if apply_visual_transform and bake_frames is not None and not len(bake_frames):
+        # An empty list would otherwise fall through to applying the current pose
+        raise ValueError("No frames to bake, the End frame is before the Start frame.")
+    profile = {} if profile_stages else None
+    start_time = time.perf_counter()
+
+    # Get selected bones if "Only Selected" is checked, otherwise get all bones
+    if only_selected:
+        target_bones = [bone for bone in target_armature.pose.bones if bone.bone.select]
+    else:
+        target_bones = target_armature.pose.bones
+
+    # Match bones by name through an index of the source armature, built once per run
+    match_start = time.perf_counter()
+    name_table = get_name_table(source_armature, target_armature, name_rules, normalize_names)
+    if source_index is None:
+        source_index = build_bone_index(source_armature.pose.bones)
+    matched_bones, unmatched_source, unmatched_target = match_bones(source_index, target_bones, name_table)
+    rows = get_matched_indices(target_armature, source_armature, matched_bones)[0]
+    match_time = (time.perf_counter() - match_start) * 1000.0
+    if profile is not None:
+        profile['match'] = match_time
+
+    direct = apply_visual_transform and direct_apply
+    if direct:
+        check_direct_apply(target_armature, (source_armature,), constraint_type, {target_bone.name for _, target_bone in matched_bones},
+                           {bone.name for bone in target_bones} if clear_previous else ())
+    with profile_stage(profile, 'constraints'):
+        if direct:
+            # Clear previous constraints FIRST if "Clear Previous" is checked
+            counts = {'created': 0, 'reused': 0, 'removed': clear_constraints(target_bones, source_armature) if clear_previous else 0}
+        else:
+            counts = reconcile_constraints(target_bones, source_armature, matched_bones, constraint_type, clear_previous)
+
+    # Apply visual transforms and remove constraints if the option is enabled
+    if apply_visual_transform and bake_frames:
+        with profile_stage(profile, 'apply'):
+            bake_proportions(target_armature, source_armature, matched_bones, constraint_type, bake_frames, direct)
+        with profile_stage(profile, 'cleanup'):
+            counts['removed'] += clear_constraints(target_bones, source_armature)
+        message = f"Visual Transform baked on {len(bake_frames)} frames."
+    elif direct:
+        with profile_stage(profile, 'apply'):
+            applied = apply_proportions_direct(target_armature, source_armature, matched_bones, constraint_type, incremental)
+        # Same cleanup as the constraint path, the constraints replaced by the transfer would override it
+        with profile_stage(profile, 'cleanup'):
+            counts['removed'] += clear_constraints(target_bones, source_armature)
+        if incremental:
+            message = f"Visual Transform re-applied directly on {applied} changed bones."
+        else:
+            message = "Visual Transform applied directly, no constraints created."
+    elif apply_visual_transform:
+        with profile_stage(profile, 'apply'):
+            visual_transform_apply(target_armature, rows)
+
+        # Clear previous constraints after applying the visual transform
+        with profile_stage(profile, 'cleanup'):
+            counts['removed'] += clear_constraints(target_bones, source_armature)
+
+        message = "Visual Transform applied, constraints removed."
+    else:
+        message = f"{constraint_type.replace('_', ' ').title()} constraints applied."
+
+    if profile is not None:
+        profile['total'] = (time.perf_counter() - start_time) * 1000.0
+    return {
+        'message': message,
+        'matched': len(matched_bones),
+        'rows': rows,
+        'unmatched_source': unmatched_source,
+        'unmatched_target': unmatched_target,
+        'match_time': match_time,
+        'created': counts['created'],
+        'reused': counts['reused'],
+        'removed': counts['removed'],
+        'profile': profile,
+    }
+
+
+def apply_proportions_blend(target_armature, sources, constraint_type='COPY_TRANSFORMS', only_selected=False,
+                            clear_previous=False, name_rules='', normalize_names=False, profile_stages=False):
+    """
+    Direct Apply of a weighted blend of several source armatures, given as (armature, weight) pairs,
+    in one pass over the target bones instead of stacking a constraint per source on every bone.
+    Bones are matched against every source on its own, a bone missing from some sources is blended
+    from the others. Raises ValueError for invalid name rules and for target armatures the direct
+    engine can't reproduce (see check_direct_apply). Returns the same summary dict as
+    apply_proportions, with the unmatched source bone names of all sources together.
+    """
+    profile = {} if profile_stages else None
+    start_time = time.perf_counter()
+    if only_selected:
+        target_bones = [bone for bone in target_armature.pose.bones if bone.bone.select]
+    else:
+        target_bones = target_armature.pose.bones
+
+    # Match the target bones against every source, a target bone only counts as unmatched if no source has it
+    match_start = time.perf_counter()
+    blend = []
+    matched_names = set()
+    unmatched_source = []
+    for source_armature, weight in sources:
+        name_table = get_name_table(source_armature, target_armature, name_rules, normalize_names)
+        matched_bones, source_unmatched, _ = match_bones(build_bone_index(source_armature.pose.bones), target_bones, name_table)
+        blend.append((source_armature, weight, matched_bones))
+        matched_names.update(target_bone.name for _, target_bone in matched_bones)
+        unmatched_source.extend(source_unmatched)
+    unmatched_target = [bone.name for bone in target_bones if bone.name not in matched_names]
+    match_time = (time.perf_counter() - match_start) * 1000.0
+    if profile is not None:
+        profile['match'] = match_time
+
+    check_direct_apply(target_armature, [source_armature for source_armature, _ in sources], constraint_type, matched_names,
+                       {bone.name for bone in target_bones} if clear_previous else ())
+    with profile_stage(profile, 'constraints'):
+        removed = sum(clear_constraints(target_bones, source_armature) for source_armature, _ in sources) if clear_previous else 0
+    with profile_stage(profile, 'apply'):
+        blended = apply_blend_direct(target_armature, blend, constraint_type)
+    with profile_stage(profile, 'cleanup'):
+        removed += sum(clear_constraints(target_bones, source_armature) for source_armature, _ in sources)
+
+    if profile is not None:
+        profile['total'] = (time.perf_counter() - start_time) * 1000.0
+    return {
+        'message': f"Visual Transform of {len(sources)} sources blended directly on {blended} bones, no constraints created.",
+        'matched': len(matched_names),
+        'unmatched_source': unmatched_source,
+        'unmatched_target': unmatched_target,
+        'match_time': match_time,
+        'created': 0,
+        'reused': 0,
+        'removed': removed,
+        'profile': profile,
+    }
+
+
+def apply_proportions_snapshot(target_armature, snapshot_path, constraint_type='COPY_TRANSFORMS', only_selected=False,
+                               name_rules='', normalize_names=False, profile_stages=False, snapshot=None):
+    """
+    Direct Apply with the source pose read from a pose snapshot file (see SavePoseSnapshot), so the
+    source armature doesn't need to be in the scene: one bulk load of the snapshot and one bulk write
+    of the target bones. snapshot reuses the already loaded file (see load_pose_snapshot), e.g. once
+    for several targets. Raises ValueError for invalid name rules, files that are not pose snapshots and
+    target armatures the direct engine can't reproduce (see check_direct_apply).
+    Returns the same summary dict as apply_proportions.
+    """
+    profile = {} if profile_stages else None
+    start_time = time.perf_counter()
+    if snapshot is None:
+        with profile_stage(profile, 'load'):
+            snapshot = load_pose_snapshot(bpy.path.abspath(snapshot_path))
+    if only_selected:
+        target_bones = [bone for bone in target_armature.pose.bones if bone.bone.select]
+    else:
+        target_bones = target_armature.pose.bones
+
+    # Match the target bones against the bone names stored in the snapshot
+    match_start = time.perf_counter()
+    source_names = snapshot['names']
+    target_names = [bone.name for bone in target_armature.pose.bones]
+    source_key = ('SNAPSHOT', bpy.path.abspath(snapshot_path))
+    name_table = get_cached_name_table(source_key, source_names, target_armature, name_rules, normalize_names) or {}
+    source_index = {name: i for i, name in enumerate(source_names)}
+    target_index = {name: i for i, name in enumerate(target_names)}
+    rows, cols, unmatched_target = [], [], []
+    for bone in target_bones:
+        col = source_index.get(name_table.get(bone.name, bone.name))
+        if col is None:
+            unmatched_target.append(bone.name)
+        else:
+            rows.append(target_index[bone.name])
+            cols.append(col)
+    matched_cols = set(cols)
+    unmatched_source = [name for i, name in enumerate(source_names) if i not in matched_cols]
+    match_time = (time.perf_counter() - match_start) * 1000.0
+    if profile is not None:
+        profile['match'] = match_time
+
+    check_direct_apply(target_armature)
+    with profile_stage(profile, 'apply'):
+        apply_snapshot_direct(target_armature, snapshot, rows, cols, constraint_type)
+
+    if profile is not None:
+        profile['total'] = (time.perf_counter() - start_time) * 1000.0
+    return {
+        'message': f"Visual Transform applied directly from snapshot {bpy.path.basename(snapshot_path)}, no constraints created.",
+        'matched': len(rows),
+        'unmatched_source': unmatched_source,
+        'unmatched_target': unmatched_target,
+        'match_time': match_time,
+        'created': 0,
+        'reused': 0,
+        'removed': 0,
+        'profile': profile,
+    }
+
+
+def apply_proportions_multi(target_armatures, source_armature, constraint_type='COPY_TRANSFORMS', apply_visual_transform=False,
+                            direct_apply=False, only_selected=False, clear_previous=False, bake_frames=None,
+                            name_rules='', normalize_names=False, incremental=False, profile_stages=False):
+    """
+    apply_proportions on several target armatures in one go, with the bone index of the source
+    armature built once for all of them. The constraint based visual transform path sets up the
+    constraints on every target first, so that the scene is evaluated once for all targets.
+    Raises ValueError for an empty bake_frames and invalid name rules. Returns the summary dict of every target.
+    """
+    source_index = build_bone_index(source_armature.pose.bones)
+    shared_visual = apply_visual_transform and not direct_apply and bake_frames is None
+    results = [apply_proportions(target_armature, source_armature, constraint_type, apply_visual_transform and not shared_visual,
+                                 direct_apply, only_selected, clear_previous, bake_frames, name_rules, normalize_names,
+                                 incremental, profile_stages, source_index)
+               for target_armature in target_armatures]
+    if not shared_visual:
+        return results
+
+    # The single evaluation is counted in the profile of the first target
+    with profile_stage(results[0]['profile'], 'apply'):
+        bpy.context.view_layer.update()
+    for target_armature, result in zip(target_armatures, results):
+        profile = result['profile']
+        bones = target_armature.pose.bones
+        with profile_stage(profile, 'apply'):
+            visual_transform_apply(target_armature, result['rows'], evaluate=False)
+        with profile_stage(profile, 'cleanup'):
+            target_bones = [bone for bone in bones if bone.bone.select] if only_selected else bones
+            result['removed'] += clear_constraints(target_bones, source_armature)
+        if profile is not None:
+            profile['total'] = sum(profile.get(stage, 0.0) for stage in PROFILE_STAGES[:-1])
+        result['message'] = "Visual Transform applied, constraints removed."
+    return results
+# ----------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+# Targets kept in sync with their source armature by proportions_live_sync, as target name to apply_proportions settings
+_live_sync = {}
+
+
+@persistent
+def proportions_live_sync(scene, depsgraph=None):
+    # Re-apply the changed bones of every live synced target whose source armature was edited
+    for target_name, settings in list(_live_sync.items()):
+        target_armature = bpy.data.objects.get(target_name)
+        source_armature = bpy.data.objects.get(settings['source'])
+        if target_armature is None or source_armature is None:
+            del _live_sync[target_name]
+            continue
+        if depsgraph is None or any(update.id.original == source_armature for update in depsgraph.updates):
+            try:
+                apply_proportions(target_armature, source_armature, settings['constraint_type'], True, True, settings['only_selected'],
+                                  name_rules=settings['name_rules'], normalize_names=settings['normalize_names'], incremental=True)
+            except ValueError as error:
+                # The target was changed so that Direct Apply can't handle it anymore, stop instead of failing on every update
+                print(f"Live sync of {target_name} stopped: {error}")
+                del _live_sync[target_name]
+                continue
+
+
+@persistent
+def proportions_state_reset(*args):
+    # Undo and redo can restore a target pose the recorded source matrices were never applied to
+    _applied_sources.clear()
+
+
+@persistent
+def proportions_state_load(*args):
+    _applied_sources.clear()
+    _live_sync.clear()
+    _name_table_cache.clear()
+# ----------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
 class CopyPoseBoneTransforms(bpy.types.Operator):
     """
     Copies the parent space transforms of the active pose bone to the clipboard.
@@ -32,12 +853,21 @@ class CopyPoseBoneTransforms(bpy.types.Operator):
         ],
     )
 
+    all_bones: bpy.props.BoolProperty(
+        name='All Bones',
+        description='Copy the transforms of every bone of the armature, one "name x y z" line per bone',
+        default=False
+    )
+
     @classmethod
     def poll(cls, context):
         return context.mode == 'POSE' or 'PAINT_WEIGHT' and context.active_pose_bone is not None
 
     def execute(self, context):
         bone = context.active_pose_bone
+        if self.all_bones:
+            return self.execute_all_bones(context, bone.id_data if bone else context.object)
+
         if bone.parent:
             parent_matrix = bone.parent.matrix.inverted_safe()
             bone_matrix = parent_matrix @ bone.matrix
@@ -50,10 +880,298 @@ class CopyPoseBoneTransforms(bpy.types.Operator):
         else:
             vector = bone_matrix.to_translation()
 
-        result_string = ' '.join([str(round(value, 6)) for value in vector])
+        result_string = format_vector(vector)
         context.window_manager.clipboard = result_string
         self.report({'INFO'}, f"{self.type.capitalize()}: {result_string}")
         return {'FINISHED'}
+
+    def execute_all_bones(self, context, armature):
+        names, translations, rotations = get_parent_space_transforms(armature)
+        values = rotations if self.type == 'ROTATION' else translations
+        lines = [name + ' ' + format_vector(vector) for name, vector in zip(names, values.tolist())]
+        context.window_manager.clipboard = '\n'.join(lines)
+        self.report({'INFO'}, f"Copied {self.type.lower()} of {len(names)} bones.")
+        return {'FINISHED'}
+# ----------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+class ExportPoseBoneTransforms(bpy.types.Operator, ExportHelper):
+    """
+    Exports the parent space transforms of the selected (or all) pose bones to a text file.
+    Translation and rotation of every bone are computed in one batch and written in a single
+    buffered write, either as VRD helper blocks for procedural bones or as QC $definebone lines.
+    VRD helpers are driven by the chosen control bone, whose current parent space rotation becomes the
+    trigger angles, and use their parent as base, so root bones and the control bone itself are skipped.
+    """
+    bl_idname = 'pose.export_parent_bone_transforms'
+    bl_label = 'Export Parent Transforms'
+    bl_description = ('Export parent space transforms of the selected pose bones to a VRD or QCI file. '
+                      'VRD helpers are driven by the Control Bone and use their parent as base, root bones are skipped')
+
+    filename_ext = '.vrd'
+
+    filter_glob: bpy.props.StringProperty(
+        default='*.vrd;*.qci',
+        options={'HIDDEN'},
+    )
+
+    file_format: bpy.props.EnumProperty(
+        name='Format',
+        items=[
+            ('VRD', 'VRD', 'Procedural bone helpers (<helper>, <basepos>, <trigger>)'),
+            ('QCI', 'QCI', '$definebone lines'),
+        ],
+    )
+
+    control_bone: bpy.props.StringProperty(
+        name='Control Bone',
+        description='Bone driving the VRD helpers, its current parent space rotation is written as the trigger angles',
+        default=''
+    )
+
+    only_selected: bpy.props.BoolProperty(
+        name='Only Selected',
+        description='Export only the selected bones',
+        default=True
+    )
+
+    @classmethod
+    def poll(cls, context):
+        obj = context.object
+        return context.active_pose_bone is not None or (obj is not None and obj.type == 'ARMATURE' and obj.mode == 'POSE')
+
+    def check(self, context):
+        self.filename_ext = '.' + self.file_format.lower()
+        return ExportHelper.check(self, context)
+
+    def draw(self, context):
+        layout = self.layout
+        layout.prop(self, 'file_format')
+        row = layout.row()
+        row.enabled = self.file_format == 'VRD'
+        if context.object is not None and context.object.type == 'ARMATURE':
+            row.prop_search(self, 'control_bone', context.object.pose, 'bones')
+        else:
+            row.prop(self, 'control_bone')
+        layout.prop(self, 'only_selected')
+
+    def execute(self, context):
+        bone = context.active_pose_bone
+        armature = bone.id_data if bone else context.object
+        names, translations, rotations = get_parent_space_transforms(armature)
+        parents = [bone.parent.name if bone.parent else '' for bone in armature.pose.bones]
+        selected = [not self.only_selected or bone.bone.select for bone in armature.pose.bones]
+
+        if self.file_format == 'VRD':
+            # The trigger angles are the rotation of the control bone relative to its parent, in the current pose
+            control = armature.pose.bones.get(self.control_bone)
+            if control is None or control.parent is None:
+                self.report({'ERROR'}, "VRD export needs a Control Bone that has a parent.")
+                return {'CANCELLED'}
+            control_rotation = format_vector(rotations[names.index(control.name)].tolist())
+
+        lines = []
+        exported = skipped_roots = 0
+        for name, parent, translation, rotation, export in zip(names, parents, translations.tolist(), rotations.tolist(), selected):
+            if not export or (self.file_format == 'VRD' and name == self.control_bone):
+                continue
+            if self.file_format == 'VRD' and not parent:
+                # A helper needs a parent bone as base
+                skipped_roots += 1
+                continue
+            exported += 1
+            if self.file_format == 'QCI':
+                lines.append('$definebone "{}" "{}" {} {} 0 0 0 0 0 0\n'.format(name, parent, format_vector(translation), format_vector(rotation)))
+            else:
+                lines.append('<helper> {} {} {} {}\n'.format(name, parent, control.parent.name, control.name))
+                lines.append('<basepos> {}\n'.format(format_vector(translation)))
+                # The trigger position is an offset from <basepos>, the helper already sits at its pose translation
+                lines.append('<trigger> 90 {} {} 0 0 0\n\n'.format(control_rotation, format_vector(rotation)))
+
+        if skipped_roots:
+            self.report({'WARNING'}, f"Skipped {skipped_roots} root bones, VRD helpers need a parent bone.")
+        if not lines:
+            self.report({'ERROR'}, "No bones to export.")
+            return {'CANCELLED'}
+
+        with open(self.filepath, 'w', encoding='utf-8', newline='\n') as file:
+            file.write(''.join(lines))
+        self.report({'INFO'}, f"Exported {exported} bones to {self.filepath}")
+        return {'FINISHED'}
+# ----------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+class ExportPoseBoneTransformsRange(bpy.types.Operator, ExportHelper):
+    """
+    Exports the parent space transforms of the selected (or all) pose bones for every frame of a range.
+    Each frame is set once, the matrices of all bones are read in bulk and the results are accumulated
+    in preallocated arrays, which are written at the end as CSV or as a NumPy .npz archive.
+    """
+    bl_idname = 'pose.export_parent_bone_transforms_range'
+    bl_label = 'Export Parent Transforms (Frame Range)'
+    bl_description = 'Export parent space transforms of the selected pose bones for every frame of a range to CSV or NumPy'
+
+    filename_ext = '.csv'
+
+    filter_glob: bpy.props.StringProperty(
+        default='*.csv;*.npz',
+        options={'HIDDEN'},
+    )
+
+    file_format: bpy.props.EnumProperty(
+        name='Format',
+        items=[
+            ('CSV', 'CSV', 'One "frame,bone,tx,ty,tz,rx,ry,rz" row per bone and frame'),
+            ('NPZ', 'NumPy', 'frames, names, translations (F, N, 3) and rotations (F, N, 3) arrays'),
+        ],
+    )
+
+    frame_start: bpy.props.IntProperty(name='Start Frame', default=1)
+    frame_end: bpy.props.IntProperty(name='End Frame', default=250)
+    frame_step: bpy.props.IntProperty(name='Frame Step', default=1, min=1)
+
+    only_selected: bpy.props.BoolProperty(
+        name='Only Selected',
+        description='Export only the selected bones',
+        default=True
+    )
+
+    @classmethod
+    def poll(cls, context):
+        return ExportPoseBoneTransforms.poll(context)
+
+    def check(self, context):
+        self.filename_ext = '.' + self.file_format.lower()
+        return ExportHelper.check(self, context)
+
+    def invoke(self, context, event):
+        self.frame_start = context.scene.frame_start
+        self.frame_end = context.scene.frame_end
+        return ExportHelper.invoke(self, context, event)
+
+    def execute(self, context):
+        bone = context.active_pose_bone
+        armature = bone.id_data if bone else context.object
+        scene = context.scene
+        frames = list(range(self.frame_start, self.frame_end + 1, self.frame_step))
+        names = [bone.name for bone in armature.pose.bones]
+        export = [i for i, bone in enumerate(armature.pose.bones) if not self.only_selected or bone.bone.select]
+        if not frames or not export:
+            self.report({'ERROR'}, "No frames or bones to export.")
+            return {'CANCELLED'}
+
+        # The hierarchy doesn't change between frames, only the matrices are read per frame
+        parent_indices = get_parent_indices(armature)
+        translations = np.empty((len(frames), len(export), 3))
+        rotations = np.empty((len(frames), len(export), 3))
+        current_frame = scene.frame_current
+        try:
+            for i, frame in enumerate(frames):
+                scene.frame_set(frame)
+                frame_translations, frame_rotations = parent_space_transforms(get_pose_matrices(armature), parent_indices)
+                translations[i] = frame_translations[export]
+                rotations[i] = frame_rotations[export]
+        finally:
+            scene.frame_set(current_frame)
+
+        names = [names[i] for i in export]
+        if self.file_format == 'NPZ':
+            np.savez(self.filepath, frames=np.array(frames), names=np.array(names), translations=translations, rotations=rotations)
+        else:
+            lines = ['frame,bone,tx,ty,tz,rx,ry,rz\n']
+            for frame, frame_translations, frame_rotations in zip(frames, translations.tolist(), rotations.tolist()):
+                for name, translation, rotation in zip(names, frame_translations, frame_rotations):
+                    lines.append('{},{},{},{}\n'.format(frame, name, format_vector(translation).replace(' ', ','), format_vector(rotation).replace(' ', ',')))
+            with open(self.filepath, 'w', encoding='utf-8', newline='\n') as file:
+                file.write(''.join(lines))
+        self.report({'INFO'}, f"Exported {len(names)} bones over {len(frames)} frames to {self.filepath}")
+        return {'FINISHED'}
+# ----------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+class SavePoseSnapshot(bpy.types.Operator, ExportHelper):
+    """
+    Saves the current pose of the armature to a pose snapshot file: bone names, parents, armature
+    space pose matrices and world matrix in one uncompressed NumPy .npz. Copy Transforms From Other
+    Armature can read its source from it, without the armature being in the scene.
+    """
+    bl_idname = 'pose.save_pose_snapshot'
+    bl_label = 'Save Pose Snapshot'
+    bl_description = 'Save the pose of the armature to a snapshot file usable as the source of Copy Transforms From Other Armature'
+
+    filename_ext = '.npz'
+
+    filter_glob: bpy.props.StringProperty(
+        default='*.npz',
+        options={'HIDDEN'},
+    )
+
+    @classmethod
+    def poll(cls, context):
+        return ExportPoseBoneTransforms.poll(context)
+
+    def execute(self, context):
+        bone = context.active_pose_bone
+        armature = bone.id_data if bone else context.object
+        names = [bone.name for bone in armature.pose.bones]
+        save_pose_snapshot(self.filepath, names, get_parent_indices(armature), get_pose_matrices(armature), armature.matrix_world)
+        self.report({'INFO'}, f"Saved the pose of {len(names)} bones to {self.filepath}")
+        return {'FINISHED'}
+# ----------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+# Armature names for the source_armature dropdown, rebuilt only after objects were added, removed or renamed.
+# The item tuples are kept alive here, since Blender does not hold references to strings of dynamic enum items.
+_armature_cache = {'names': None, 'object_count': -1, 'items': {}}
+
+
+def invalidate_armature_cache():
+    _armature_cache['names'] = None
+    _armature_cache['items'].clear()
+
+
+def get_armature_names():
+    """Returns the names of all armature objects, scanning bpy.data.objects only when the cache was invalidated."""
+    object_count = len(bpy.data.objects)
+    if _armature_cache['names'] is None or _armature_cache['object_count'] != object_count:
+        invalidate_armature_cache()
+        _armature_cache['names'] = [obj.name for obj in bpy.data.objects if obj.type == 'ARMATURE']
+        _armature_cache['object_count'] = object_count
+    return _armature_cache['names']
+
+
+def source_armature_items(self, context):
+    target_armature = ApplyCopyTransformsConstraints.get_target_armature(context)
+    target_name = target_armature.name if target_armature else ''
+    names = get_armature_names()
+    items = _armature_cache['items'].get(target_name)
+    if items is None:
+        items = _armature_cache['items'][target_name] = [(name, name, "") for name in names if name != target_name]
+    return items
+
+
+@persistent
+def armature_cache_update(scene, depsgraph=None):
+    # Only object changes can add, remove or rename armatures
+    if depsgraph is None or depsgraph.id_type_updated('OBJECT'):
+        invalidate_armature_cache()
+
+
+@persistent
+def armature_cache_load(*args):
+    invalidate_armature_cache()
+
+
+def blend_count_update(self, context):
+    # Grows or shrinks the list of blend sources drawn in the dialog
+    while len(self.blend_sources) < self.blend_count:
+        self.blend_sources.add()
+    while len(self.blend_sources) > self.blend_count:
+        self.blend_sources.remove(len(self.blend_sources) - 1)
+
+
+def frame_range_update(self, context):
+    # End can't come before Start, the range to bake would have no frames
+    if self.frame_end < self.frame_start:
+        self.frame_end = self.frame_start
+
+
+class BlendSource(bpy.types.PropertyGroup):
+    """A source armature of the blend and its weight."""
+    armature: bpy.props.EnumProperty(items=source_armature_items, name="Armature")
+    weight: bpy.props.FloatProperty(name="Weight", min=0.0, soft_max=1.0, default=1.0)
 # ----------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
 class ApplyCopyTransformsConstraints(bpy.types.Operator):
     """
@@ -66,16 +1184,51 @@ class ApplyCopyTransformsConstraints(bpy.types.Operator):
     If the "Apply as Visual Transform" option is selected, the constraints will be applied to the 
     target armature, followed by a visual transform application. All copy constraints from the source
     armature will then be removed from the target armature.
+
+    With "Direct Apply" the visual result is instead computed from the source pose in a single
+    hierarchical pass and written to the target bones, without creating any constraints.
+
+    With "Bake Frame Range" the visual result is baked into keyframes on every frame of the range.
+
+    With "Only Changed Bones" a direct apply only re-applies the bones whose source pose changed since
+    the previous direct apply, and "Live Sync" keeps doing so whenever the source armature is edited
+    until the operator is run again on the same target without it.
+
+    With "Blend Sources" the listed armatures are blended by weight and applied directly in place
+    of the single source, computing the weighted transform instead of stacking constraints.
+
+    With "Snapshot" the source pose is read from a pose snapshot file (see SavePoseSnapshot) and
+    applied directly, so the source armature doesn't need to be in the scene.
+
+    With "All Selected Armatures" every selected armature is a target besides the active one, all
+    of them processed in one run that shares the source bone index and evaluates the scene once.
     """
     bl_idname = "pose.copy_transforms_from_other"
     bl_label = "Copy Transforms From Other Armature"
     bl_description = 'Copy transforms on matching bone names from another armature in the scene'
     bl_options = {'REGISTER', 'UNDO'}
 
-    source_armature: bpy.props.EnumProperty(
-        items=lambda self, context: [
-            (obj.name, obj.name, "") for obj in bpy.data.objects
-            if obj.type == 'ARMATURE' and obj != ApplyCopyTransformsConstraints.get_target_armature(context)], name="Source")
+    source_armature: bpy.props.EnumProperty(items=source_armature_items, name="Source")
+
+    blend_sources: bpy.props.CollectionProperty(type=BlendSource, name="Blend Sources")
+
+    blend_count: bpy.props.IntProperty(
+        name="Blend Sources",
+        description="Number of source armatures blended by weight in place of the Source. "
+                    "Always applied directly as visual transform",
+        min=0,
+        soft_max=8,
+        default=0,
+        update=blend_count_update
+    )
+
+    snapshot_path: bpy.props.StringProperty(
+        name="Snapshot",
+        description="Pose snapshot file to read the source pose from in place of the Source. "
+                    "Always applied directly as visual transform",
+        subtype='FILE_PATH',
+        default=""
+    )
     
     constraint_type: bpy.props.EnumProperty(
         name="Constraint Type",
@@ -93,12 +1246,59 @@ class ApplyCopyTransformsConstraints(bpy.types.Operator):
         default=False
     )
 
+    direct_apply: bpy.props.BoolProperty(
+        name="Direct Apply",
+        description="Compute the visual transform directly from the source pose instead of creating, applying and removing constraints. "
+                    "Needs target bones with default inheritance and no other constraints",
+        default=False
+    )
+
+    incremental: bpy.props.BoolProperty(
+        name="Only Changed Bones",
+        description="Only re-apply the bones whose source pose changed, or whose pose was edited, since the previous direct apply",
+        default=False
+    )
+
+    live_sync: bpy.props.BoolProperty(
+        name="Live Sync",
+        description="Keep re-applying the changed bones directly whenever the source armature is edited",
+        default=False
+    )
+
+    bake_range: bpy.props.BoolProperty(
+        name="Bake Frame Range",
+        description="Bake the visual transform into keyframes on every frame of the range instead of the current pose",
+        default=False
+    )
+
+    frame_start: bpy.props.IntProperty(name="Start Frame", default=1, update=frame_range_update)
+    frame_end: bpy.props.IntProperty(name="End Frame", default=250, update=frame_range_update)
+
+    normalize_names: bpy.props.BoolProperty(
+        name="Normalize Names",
+        description="Match bone names regardless of case, separators, ValveBiped.Bip01 prefix and side markers (.L, _L, L_, Left)",
+        default=False
+    )
+
+    name_rules: bpy.props.StringProperty(
+        name="Rename Rules",
+        description="Rename rules separated by ';' applied to both armatures' bone names before matching: "
+                    "'old=new' or 're:pattern=replacement'",
+        default=""
+    )
+
     only_selected: bpy.props.BoolProperty(
         name="Only Selected",
         description="Apply constraints only to the selected bones",
         default=False
     )
 
+    all_selected: bpy.props.BoolProperty(
+        name="All Selected Armatures",
+        description="Apply to every selected armature besides the active one, in a single run",
+        default=False
+    )
+
     clear_previous: bpy.props.BoolProperty(
         name="Clear Previous",
         description="Clear existing COPY constraints (rotation/location/scale/transforms) before applying new ones",
@@ -130,24 +1330,29 @@ class ApplyCopyTransformsConstraints(bpy.types.Operator):
             return armature and armature.mode == 'POSE'
         return False
 
+    def get_target_armatures(self, context, target_armature, source_armatures=()):
+        """Returns the target armature, followed by the other selected armatures with "All Selected Armatures"."""
+        targets = [target_armature]
+        if self.all_selected:
+            targets.extend(obj for obj in context.selected_objects
+                           if obj.type == 'ARMATURE' and obj != target_armature and obj not in source_armatures)
+        return targets
+
     def invoke(self, context, event):
-        # Check if there's another armature in the scene, excluding the target armature
+        # Without another armature in the scene, the source can only come from a snapshot
         target_armature = self.get_target_armature(context)
-        other_armatures_exist = any(obj.type == 'ARMATURE' and obj != target_armature for obj in bpy.data.objects)
+        other_armatures_exist = any(name != getattr(target_armature, 'name', None) for name in get_armature_names())
 
-        if not other_armatures_exist:
-            self.report({'ERROR'}, "No other armatures found in the scene.")
-            return {'CANCELLED'}
+        if not other_armatures_exist and not self.snapshot_path:
+            self.report({'WARNING'}, "No other armatures found in the scene, pick a pose snapshot as the source.")
 
+        self.blend_count = len(self.blend_sources)
+        if not self.bake_range:
+            self.frame_start = context.scene.frame_start
+            self.frame_end = context.scene.frame_end
         self.dialog_shown = True
         return context.window_manager.invoke_props_dialog(self)
 
-    def clear_constraints(self, bones, source_armature):
-        for bone in bones:
-            constraints_to_remove = [c for c in bone.constraints if c.type in ['COPY_ROTATION', 'COPY_LOCATION', 'COPY_SCALE', 'COPY_TRANSFORMS'] and c.target == source_armature]
-            for constraint in constraints_to_remove:
-                bone.constraints.remove(constraint)
-
     def execute(self, context):
         if not self.dialog_shown:
             return self.invoke(context, None)
@@ -155,75 +1360,195 @@ class ApplyCopyTransformsConstraints(bpy.types.Operator):
         # Get the target armature (either the active armature in Pose mode or the linked armature in Weight Paint mode)
         target_armature = self.get_target_armature(context)
         source_armature_name = self.source_armature
+        if target_armature and self.snapshot_path:
+            return self.execute_snapshot(context, target_armature)
+        if target_armature and self.blend_sources:
+            return self.execute_blend(context, target_armature)
 
         # Ensure valid armatures are selected
         if not source_armature_name or not target_armature:
-            self.report({'ERROR'}, "Requires a valid source armature and target armature.")
+            self.report({'ERROR'}, "Requires a valid source armature or snapshot and a target armature.")
             return {'CANCELLED'}
 
-        source_armature = bpy.data.objects[source_armature_name]
-        created_constraints = []
+        # The cached armature names can be stale, e.g. after a rename without a scene update in between
+        source_armature = bpy.data.objects.get(source_armature_name)
+        if not source_armature or source_armature.type != 'ARMATURE':
+            invalidate_armature_cache()
+            self.report({'ERROR'}, f"Source armature '{source_armature_name}' no longer exists, pick it again.")
+            return {'CANCELLED'}
+        target_armatures = self.get_target_armatures(context, target_armature, [source_armature])
+        preferences = get_addon_preferences(context)
+        bake_frames = list(range(self.frame_start, self.frame_end + 1)) if self.bake_range else None
+        try:
+            results = apply_proportions_multi(target_armatures, source_armature, self.constraint_type, self.apply_visual_transform,
+                                              self.direct_apply, self.only_selected, self.clear_previous, bake_frames,
+                                              self.name_rules, self.normalize_names, self.incremental,
+                                              getattr(preferences, 'profile_stages', False))
+        except ValueError as error:
+            self.report({'ERROR'}, str(error))
+            return {'CANCELLED'}
 
-        # Get selected bones if "Only Selected" is checked, otherwise get all bones
-        if self.only_selected:
-            target_bones = [bone for bone in target_armature.pose.bones if bone.bone.select]
-        else:
-            target_bones = target_armature.pose.bones
+        for armature in target_armatures:
+            if self.live_sync and self.apply_visual_transform and self.direct_apply and not self.bake_range:
+                _live_sync[armature.name] = {
+                    'source': source_armature.name,
+                    'constraint_type': self.constraint_type,
+                    'only_selected': self.only_selected,
+                    'name_rules': self.name_rules,
+                    'normalize_names': self.normalize_names,
+                }
+            else:
+                _live_sync.pop(armature.name, None)
 
-        # Clear previous constraints FIRST if "Clear Previous" is checked
-        if self.clear_previous:
-            self.clear_constraints(target_bones, source_armature)
+        return self.finish(merge_results(results))
 
-        for bone in source_armature.pose.bones:
-            for target_bone in target_bones:
-                if bone.name == target_bone.name:
-                    existing_constraints = [c for c in target_bone.constraints if c.type == self.constraint_type and c.target == source_armature]
-                    for constraint in existing_constraints:
-                        target_bone.constraints.remove(constraint)
+    def execute_snapshot(self, context, target_armature):
+        target_armatures = self.get_target_armatures(context, target_armature)
+        try:
+            # Loaded once and shared by all targets
+            snapshot = load_pose_snapshot(bpy.path.abspath(self.snapshot_path))
+            results = [apply_proportions_snapshot(armature, self.snapshot_path, self.constraint_type, self.only_selected,
+                                                  self.name_rules, self.normalize_names,
+                                                  getattr(get_addon_preferences(context), 'profile_stages', False), snapshot)
+                       for armature in target_armatures]
+        except ValueError as error:
+            self.report({'ERROR'}, str(error))
+            return {'CANCELLED'}
 
-                    constraint = target_bone.constraints.new(self.constraint_type)
-                    constraint.target = source_armature
-                    constraint.subtarget = bone.name
-                    created_constraints.append((target_bone, constraint))  # Store bone and constraint
+        for armature in target_armatures:
+            _live_sync.pop(armature.name, None)
+        return self.finish(merge_results(results))
 
-        # Apply visual transforms and remove constraints if the option is enabled
-        if self.apply_visual_transform:
-            bpy.ops.pose.select_all(action='SELECT')
-            bpy.ops.pose.visual_transform_apply()
+    def execute_blend(self, context, target_armature):
+        try:
+            sources = []
+            for item in self.blend_sources:
+                source_armature = bpy.data.objects.get(item.armature)
+                if not source_armature or source_armature.type != 'ARMATURE' or source_armature == target_armature:
+                    raise ValueError(f"Blend source '{item.armature}' is not another armature.")
+                sources.append((source_armature, item.weight))
+            target_armatures = self.get_target_armatures(context, target_armature, [source for source, _ in sources])
+            results = [apply_proportions_blend(armature, sources, self.constraint_type, self.only_selected, self.clear_previous,
+                                               self.name_rules, self.normalize_names,
+                                               getattr(get_addon_preferences(context), 'profile_stages', False))
+                       for armature in target_armatures]
+        except ValueError as error:
+            self.report({'ERROR'}, str(error))
+            return {'CANCELLED'}
 
-            # Clear previous constraints after applying the visual transform
-            self.clear_constraints(target_bones, source_armature)
+        for armature in target_armatures:
+            _live_sync.pop(armature.name, None)
+        return self.finish(merge_results(results))
 
-            self.report({'INFO'}, "Visual Transform applied, constraints removed.")
-        else:
-            self.report({'INFO'}, f"{self.constraint_type.replace('_', ' ').title()} constraints applied.")
+    def finish(self, result):
+        self.report({'INFO'}, f"{result['message']} Matched {result['matched']} bones ({len(result['unmatched_source'])} unmatched source, "
+                              f"{len(result['unmatched_target'])} unmatched target) in {result['match_time']:.2f} ms. "
+                              f"Constraints: {result['created']} created, {result['reused']} reused, {result['removed']} removed.")
 
+        if result['profile'] is not None:
+            breakdown = format_profile(result['profile'])
+            print(f"{self.bl_idname}: {breakdown}")
+            self.report({'INFO'}, f"Stages: {breakdown}")
+
+        # Evaluate the scene once, for all the changes made above
         bpy.context.view_layer.update()
         return {'FINISHED'}
 
     def draw(self, context):
         layout = self.layout
-        layout.prop(self, "source_armature", text="Source")
+        row = layout.row()
+        row.enabled = not self.blend_sources and not self.snapshot_path
+        row.prop(self, "source_armature", text="Source")
+        row = layout.row()
+        row.enabled = not self.snapshot_path
+        row.prop(self, "blend_count", text="Blend")
+        for item in self.blend_sources:
+            row = layout.row(align=True)
+            row.enabled = not self.snapshot_path
+            row.prop(item, "armature", text="")
+            row.prop(item, "weight", text="Weight")
+        layout.prop(self, "snapshot_path", text="Snapshot")
         layout.prop(self, "constraint_type", text="Type")
+        layout.prop(self, "normalize_names", text="Normalize Names")
+        layout.prop(self, "name_rules", text="Rules")
         layout.prop(self, "apply_visual_transform", text="Apply as Visual Transform")
+        row = layout.row()
+        row.enabled = self.apply_visual_transform
+        row.prop(self, "direct_apply", text="Direct Apply")
+        row = layout.row()
+        row.enabled = self.apply_visual_transform and self.direct_apply and not self.bake_range
+        row.prop(self, "incremental", text="Only Changed Bones")
+        row.prop(self, "live_sync", text="Live Sync")
+        row = layout.row()
+        row.enabled = self.apply_visual_transform
+        row.prop(self, "bake_range", text="Bake Frame Range")
+        row = layout.row(align=True)
+        row.enabled = self.apply_visual_transform and self.bake_range
+        row.prop(self, "frame_start", text="Start")
+        row.prop(self, "frame_end", text="End")
         layout.prop(self, "only_selected", text="Only Selected")
+        layout.prop(self, "all_selected", text="All Selected Armatures")
         layout.prop(self, "clear_previous", text="Clear Previous")
 # ----------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+class PoseBoneTransformsPreferences(bpy.types.AddonPreferences):
+    """Preferences of the addon, shown in its entry of the Add-ons list."""
+    bl_idname = __name__
+
+    profile_stages: bpy.props.BoolProperty(
+        name="Profile Stages",
+        description="Time every stage of Copy Transforms From Other Armature and report the breakdown, also printed to the console",
+        default=False
+    )
+
+    def draw(self, context):
+        self.layout.prop(self, "profile_stages")
+
+
+def get_addon_preferences(context):
+    """Returns the preferences of this addon, or None when the module was loaded as a plain script."""
+    addon = context.preferences.addons.get(__name__)
+    return addon.preferences if addon else None
+# ----------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
 def context_menu_func(self, context):
     self.layout.separator()
     self.layout.operator(CopyPoseBoneTransforms.bl_idname, text='Copy Parent Translation').type = 'TRANSLATION'
     self.layout.operator(CopyPoseBoneTransforms.bl_idname, text='Copy Parent Rotation').type = 'ROTATION'
+    self.layout.operator(ExportPoseBoneTransforms.bl_idname, text='Export Parent Transforms...')
+    self.layout.operator(ExportPoseBoneTransformsRange.bl_idname, text='Export Parent Transforms (Frame Range)...')
+    self.layout.operator(SavePoseSnapshot.bl_idname, text='Save Pose Snapshot...')
     self.layout.operator(ApplyCopyTransformsConstraints.bl_idname, text='Copy Transforms From Other Armature')
 # ----------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
 def register():
+    bpy.utils.register_class(PoseBoneTransformsPreferences)
     bpy.utils.register_class(CopyPoseBoneTransforms)
+    bpy.utils.register_class(ExportPoseBoneTransforms)
+    bpy.utils.register_class(ExportPoseBoneTransformsRange)
+    bpy.utils.register_class(SavePoseSnapshot)
+    bpy.utils.register_class(BlendSource)
     bpy.utils.register_class(ApplyCopyTransformsConstraints)
     bpy.types.VIEW3D_MT_pose_context_menu.append(context_menu_func)
+    bpy.app.handlers.depsgraph_update_post.append(armature_cache_update)
+    bpy.app.handlers.load_post.append(armature_cache_load)
+    bpy.app.handlers.depsgraph_update_post.append(proportions_live_sync)
+    bpy.app.handlers.undo_post.append(proportions_state_reset)
+    bpy.app.handlers.redo_post.append(proportions_state_reset)
+    bpy.app.handlers.load_post.append(proportions_state_load)
 # ----------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
 def unregister():
     bpy.utils.unregister_class(CopyPoseBoneTransforms)
+    bpy.utils.unregister_class(ExportPoseBoneTransforms)
+    bpy.utils.unregister_class(ExportPoseBoneTransformsRange)
+    bpy.utils.unregister_class(SavePoseSnapshot)
     bpy.utils.unregister_class(ApplyCopyTransformsConstraints)
+    bpy.utils.unregister_class(BlendSource)
+    bpy.utils.unregister_class(PoseBoneTransformsPreferences)
     bpy.types.VIEW3D_MT_pose_context_menu.remove(context_menu_func)
+    bpy.app.handlers.depsgraph_update_post.remove(armature_cache_update)
+    bpy.app.handlers.load_post.remove(armature_cache_load)
+    bpy.app.handlers.depsgraph_update_post.remove(proportions_live_sync)
+    bpy.app.handlers.undo_post.remove(proportions_state_reset)
+    bpy.app.handlers.redo_post.remove(proportions_state_reset)
+    bpy.app.handlers.load_post.remove(proportions_state_load)
 # ----------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
 if __name__ == "__main__":
     register()
@@ -0,0 +1,302 @@
+"""Tests of the Blender independent math core, run with plain pytest outside of Blender."""
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from pose_bone_math import (EULER_ORDERS, basis_to_channels, blend_matrices, build_name_table, compute_direct_basis,
+                            decompose_basis_sequence, decompose_matrices, load_pose_snapshot, make_eulers_compatible,
+                            matrices_to_euler, matrices_to_quaternions, normalize_bone_name, parse_name_rules,
+                            pose_to_basis, quaternions_to_axis_angle, quaternions_to_matrices,
+                            save_pose_snapshot)
+
+# mathutils Euler((0.1, 0.2, 0.3)).to_matrix()
+XYZ_REFERENCE = [[0.93629336, -0.27509585, 0.21835066],
+                 [0.28962948, 0.95642509, -0.03695701],
+                 [-0.19866933, 0.0978434, 0.97517033]]
+
+
+def to_matrices(rotations):
+    matrices = np.tile(np.identity(4), (len(rotations), 1, 1))
+    matrices[:, :3, :3] = rotations
+    return matrices
+
+
+def axis_rotations(axis, angles):
+    """(N, 3, 3) rotations around the X (0), Y (1) or Z (2) axis."""
+    i, j = (axis + 1) % 3, (axis + 2) % 3
+    rotations = np.tile(np.identity(3), (len(angles), 1, 1))
+    rotations[:, i, i] = rotations[:, j, j] = np.cos(angles)
+    rotations[:, j, i] = np.sin(angles)
+    rotations[:, i, j] = -np.sin(angles)
+    return rotations
+
+
+def random_matrices(rng, count, scale=True):
+    rotations, triangular = np.linalg.qr(rng.normal(size=(count, 3, 3)))
+    rotations *= np.sign(np.diagonal(triangular, axis1=1, axis2=2))[:, None, :]
+    rotations[np.linalg.det(rotations) < 0.0] *= -1.0
+    matrices = to_matrices(rotations)
+    if scale:
+        matrices[:, :3, :3] *= rng.uniform(0.5, 2.0, size=(count, 1, 3))
+    matrices[:, :3, 3] = rng.normal(size=(count, 3))
+    return matrices
+
+
+def forward_pose(basis, rest, parent_indices):
+    """Armature space pose of every bone, evaluated the way Blender does with full inheritance."""
+    pose = np.empty_like(basis)
+    for i, parent in enumerate(parent_indices):
+        offset = np.linalg.inv(rest[parent]) @ rest[i] if parent >= 0 else rest[i]
+        pose[i] = (pose[parent] if parent >= 0 else np.identity(4)) @ offset @ basis[i]
+    return pose
+
+
+@pytest.fixture
+def rig():
+    rng = np.random.default_rng(7)
+    parent_indices = np.array([-1, 0, 1, 1, 0, 4])
+    return rng, random_matrices(rng, 6, scale=False), parent_indices
+
+
+def test_matrices_to_euler_reference():
+    np.testing.assert_allclose(matrices_to_euler(to_matrices(np.array([XYZ_REFERENCE]))), [[0.1, 0.2, 0.3]], atol=1e-7)
+
+
+def test_matrices_to_euler_ignores_scale():
+    matrices = to_matrices(np.array([XYZ_REFERENCE]))
+    matrices[:, :3, :3] *= [2.0, 0.5, 3.0]
+    np.testing.assert_allclose(matrices_to_euler(matrices), [[0.1, 0.2, 0.3]], atol=1e-7)
+
+
+def test_matrices_to_euler_gimbal_lock():
+    # X 0.3, Y 90 degrees and Z 0.5 collapse into X -0.2 with no Z rotation, as in Blender
+    c, s = np.cos(-0.2), np.sin(-0.2)
+    rotation = np.array([[0.0, s, c], [0.0, c, -s], [-1.0, 0.0, 0.0]])
+    np.testing.assert_allclose(matrices_to_euler(to_matrices(rotation[None])), [[-0.2, np.pi / 2.0, 0.0]], atol=1e-7)
+
+
+def test_matrices_to_euler_round_trip():
+    matrices = random_matrices(np.random.default_rng(1), 20, scale=False)
+    eulers = matrices_to_euler(matrices)
+    # Rotating around X, then Y, then Z rebuilds the rotation
+    rebuilt = axis_rotations(2, eulers[:, 2]) @ axis_rotations(1, eulers[:, 1]) @ axis_rotations(0, eulers[:, 0])
+    np.testing.assert_allclose(rebuilt, matrices[:, :3, :3], atol=1e-9)
+
+
+def test_compute_direct_basis_copy_transforms(rig):
+    rng, rest, parent_indices = rig
+    basis = random_matrices(rng, len(rest))
+    source = random_matrices(rng, len(rest))
+    matched = np.array([True, False, True, True, False, True])
+
+    new_basis = compute_direct_basis(basis, rest, parent_indices, source, matched, 'COPY_TRANSFORMS')
+    pose = forward_pose(new_basis, rest, parent_indices)
+    np.testing.assert_allclose(pose[matched], source[matched], atol=1e-9)
+    np.testing.assert_allclose(new_basis[~matched], basis[~matched])
+
+
+def test_pose_to_basis_round_trip(rig):
+    rng, rest, parent_indices = rig
+    basis = random_matrices(rng, len(rest))
+    np.testing.assert_allclose(pose_to_basis(forward_pose(basis, rest, parent_indices), rest, parent_indices), basis, atol=1e-9)
+
+
+@pytest.mark.parametrize('axis', range(3))
+def test_matrices_to_quaternions_axis_rotations(axis):
+    angles = np.array([0.0, 0.7, -2.5, 3.0])
+    quaternions = matrices_to_quaternions(to_matrices(axis_rotations(axis, angles)) * [2.0, 2.0, 2.0, 1.0])
+    expected = np.zeros((len(angles), 4))
+    expected[:, 0] = np.cos(angles / 2.0)
+    expected[:, 1 + axis] = np.sin(angles / 2.0)
+    np.testing.assert_allclose(quaternions, expected, atol=1e-7)
+
+
+def test_decompose_basis_sequence_is_continuous():
+    # A full turn around Z over 9 frames, which crosses the +-180 degree boundary of both rotation representations
+    angles = np.linspace(0.0, 2.0 * np.pi, 9)
+    basis = to_matrices(axis_rotations(2, angles))[:, None]
+    basis[:, 0, :3, 3] = angles[:, None]
+    locations, quaternions, eulers, scales = decompose_basis_sequence(basis)
+    np.testing.assert_allclose(locations[:, 0], np.repeat(angles[:, None], 3, axis=1))
+    np.testing.assert_allclose(eulers[:, 0, 2], angles, atol=1e-9)
+    np.testing.assert_allclose(quaternions[:, 0, 0], np.cos(angles / 2.0), atol=1e-9)
+    np.testing.assert_allclose(scales, 1.0)
+
+
+def test_normalize_bone_name():
+    assert normalize_bone_name('ValveBiped.Bip01_L_UpperArm') == 'upperarm_l'
+    assert normalize_bone_name('UpperArm.L') == 'upperarm_l'
+    assert normalize_bone_name('upperarm_left') == 'upperarm_l'
+    assert normalize_bone_name('Spine-2') == 'spine_2'
+
+
+def test_build_name_table():
+    source_names = ['ValveBiped.Bip01_Pelvis', 'ValveBiped.Bip01_L_Thigh', 'Head']
+    target_names = ['Hips', 'Thigh.L', 'Head', 'Tail']
+    table = build_name_table(source_names, target_names, parse_name_rules('Hips=Pelvis'), normalize=True)
+    assert table == {'Hips': 'ValveBiped.Bip01_Pelvis', 'Thigh.L': 'ValveBiped.Bip01_L_Thigh'}
+    assert build_name_table(['mixamorig:Hips'], ['Hips'], parse_name_rules('re:^mixamorig:=')) == {'Hips': 'mixamorig:Hips'}
+
+
+@pytest.mark.parametrize('text', ['Hips', 're:([=Pelvis'])
+def test_parse_name_rules_invalid(text):
+    with pytest.raises(ValueError):
+        parse_name_rules(text)
+
+
+def test_quaternions_to_matrices_round_trip():
+    matrices = random_matrices(np.random.default_rng(1), 20, scale=False)
+    np.testing.assert_allclose(quaternions_to_matrices(matrices_to_quaternions(matrices)), matrices[:, :3, :3], atol=1e-9)
+
+
+def test_blend_matrices_single_source():
+    matrices = random_matrices(np.random.default_rng(5), 4)
+    weights = np.array([[0.5, 2.0, 0.0, 1.0]])
+    result, blended = blend_matrices(matrices[None], weights)
+    np.testing.assert_array_equal(blended, [True, True, False, True])
+    np.testing.assert_allclose(result[blended], matrices[blended], atol=1e-9)
+    np.testing.assert_allclose(result[2], np.identity(4))
+
+
+def test_blend_matrices_halfway():
+    matrices = to_matrices(axis_rotations(2, np.array([0.0, 1.0])))[:, None]
+    matrices[1, 0, :3, 3] = (2.0, 0.0, 0.0)
+    result, blended = blend_matrices(matrices, np.array([[1.0], [1.0]]))
+    expected = to_matrices(axis_rotations(2, np.array([0.5])))
+    expected[:, :3, 3] = (1.0, 0.0, 0.0)
+    np.testing.assert_allclose(result, expected, atol=1e-12)
+
+
+def test_pose_snapshot_round_trip(tmp_path, rig):
+    rng, matrices, parent_indices = rig
+    names = ['root', 'spine', 'head', 'jaw', 'arm', 'hand']
+    matrix_world = random_matrices(rng, 1)[0]
+    path = str(tmp_path / 'pose.npz')
+    save_pose_snapshot(path, names, parent_indices, matrices, matrix_world)
+
+    snapshot = load_pose_snapshot(path)
+    assert snapshot['names'] == names
+    np.testing.assert_array_equal(snapshot['parents'], parent_indices)
+    np.testing.assert_allclose(snapshot['matrices'], matrices, atol=1e-6)
+    np.testing.assert_allclose(snapshot['matrix_world'], matrix_world)
+
+
+def test_load_pose_snapshot_missing_arrays(tmp_path):
+    path = str(tmp_path / 'pose.npz')
+    np.savez(path, version=np.array(1), names=np.array(['root']))
+    with pytest.raises(ValueError, match='Not a pose snapshot'):
+        load_pose_snapshot(path)
+
+
+# mathutils Euler((0.1, 0.2, 0.3), 'ZXY').to_matrix()
+ZXY_REFERENCE = [[0.94215466, -0.27068149, 0.19767681],
+                 [0.29404384, 0.95056379, -0.09983342],
+                 [-0.16088136, 0.15218417, 0.97517033]]
+
+
+def test_matrices_to_euler_order_reference():
+    np.testing.assert_allclose(matrices_to_euler(to_matrices(np.array([ZXY_REFERENCE])), 'ZXY'), [[0.1, 0.2, 0.3]], atol=1e-7)
+
+
+@pytest.mark.parametrize('order', sorted(EULER_ORDERS))
+def test_matrices_to_euler_order_round_trip(order):
+    matrices = random_matrices(np.random.default_rng(1), 20, scale=False)
+    eulers = matrices_to_euler(matrices, order)
+    # Rotating around the axes one after another in the given order rebuilds the rotation
+    rebuilt = np.tile(np.identity(3), (len(matrices), 1, 1))
+    for axis in ['XYZ'.index(name) for name in order]:
+        rebuilt = axis_rotations(axis, eulers[:, axis]) @ rebuilt
+    np.testing.assert_allclose(rebuilt, matrices[:, :3, :3], atol=1e-9)
+
+def test_make_eulers_compatible():
+    eulers = make_eulers_compatible(np.array([[0.1, -3.0, 3.0]]), np.array([[4.0 * np.pi, 3.0, -3.0]]))
+    np.testing.assert_allclose(eulers, [[0.1 + 4.0 * np.pi, 2.0 * np.pi - 3.0, 3.0 - 2.0 * np.pi]])
+
+
+def test_quaternions_to_axis_angle():
+    half = np.pi / 4.0
+    axis_angles = quaternions_to_axis_angle(np.array([[np.cos(half), 0.0, 0.0, np.sin(half)], [1.0, 0.0, 0.0, 0.0]]))
+    np.testing.assert_allclose(axis_angles, [[np.pi / 2.0, 0.0, 0.0, 1.0], [0.0, 0.0, 1.0, 0.0]], atol=1e-12)
+
+
+def test_basis_to_channels_keeps_other_rotation_modes():
+    rng = np.random.default_rng(3)
+    basis = random_matrices(rng, 3)
+    current = {'rotation_quaternion': np.tile([1.0, 0.0, 0.0, 0.0], (3, 1)), 'rotation_euler': np.zeros((3, 3)),
+               'rotation_axis_angle': np.tile([0.0, 0.0, 1.0, 0.0], (3, 1))}
+    channels = basis_to_channels(basis, ['QUATERNION', 'ZXY', 'AXIS_ANGLE'], current)
+
+    np.testing.assert_allclose(channels['location'], basis[:, :3, 3])
+    np.testing.assert_allclose(channels['scale'], np.linalg.norm(basis[:, :3, :3], axis=1))
+    np.testing.assert_allclose(channels['rotation_quaternion'][1:], current['rotation_quaternion'][1:])
+    np.testing.assert_allclose(channels['rotation_euler'][[0, 2]], 0.0)
+    np.testing.assert_allclose(channels['rotation_euler'][1], matrices_to_euler(basis[1:2], 'ZXY')[0])
+    np.testing.assert_allclose(channels['rotation_axis_angle'][:2], current['rotation_axis_angle'][:2])
+    rotation = quaternions_to_matrices(channels['rotation_quaternion'][:1])
+    np.testing.assert_allclose(rotation * np.linalg.norm(basis[:1, :3, :3], axis=1)[:, None, :], basis[:1, :3, :3], atol=1e-12)
+
+
+def test_decompose_basis_sequence_rotation_modes():
+    basis = random_matrices(np.random.default_rng(4), 6, scale=False).reshape(2, 3, 4, 4)
+    eulers = decompose_basis_sequence(basis, ['ZXY', 'QUATERNION', 'YZX'])[2]
+    for column, order in enumerate(['ZXY', 'XYZ', 'YZX']):
+        np.testing.assert_allclose(eulers[:, column], matrices_to_euler(basis[:, column], order), atol=1e-9)
+
+
+@pytest.mark.parametrize('content', [None, b'PK\x03\x04 not a zip archive', b'plain text'])
+def test_load_pose_snapshot_invalid(tmp_path, content):
+    if content is None:
+        path = str(tmp_path / 'pose.npy')
+        np.save(path, np.zeros((2, 4, 4)))
+    else:
+        path = str(tmp_path / 'pose.npz')
+        with open(path, 'wb') as file:
+            file.write(content)
+    with pytest.raises(ValueError, match='Not a pose snapshot'):
+        load_pose_snapshot(path)
+
+
+def half_turns(axes, angle=np.pi):
+    """Rotation matrices of the given angle around each of the (N, 3) axes."""
+    axes = axes / np.linalg.norm(axes, axis=1, keepdims=True)
+    quaternions = np.concatenate([np.full((len(axes), 1), np.cos(angle / 2.0)), axes * np.sin(angle / 2.0)], axis=1)
+    return to_matrices(quaternions_to_matrices(quaternions))
+
+
+def test_matrices_to_quaternions_half_turn():
+    axes = np.array([[1.0, -1.0, 0.0], [0.0, 0.0, 1.0], [-2.0, 1.0, 3.0], [0.3, -0.2, -0.9]])
+    matrices = half_turns(axes)
+    np.testing.assert_allclose(quaternions_to_matrices(matrices_to_quaternions(matrices)), matrices[:, :3, :3], atol=1e-12)
+
+    # Within 1e-7 of a half turn, read back from float32 like foreach_get does
+    matrices = half_turns(np.random.default_rng(2).normal(size=(50, 3)), np.pi - 1e-7).astype(np.float32).astype(np.float64)
+    np.testing.assert_allclose(quaternions_to_matrices(matrices_to_quaternions(matrices)), matrices[:, :3, :3], atol=1e-6)
+
+
+def test_blend_matrices_single_source_half_turn():
+    matrices = half_turns(np.array([[1.0, -1.0, 0.0], [0.2, 0.5, -1.0]]))
+    result, blended = blend_matrices(matrices[None], np.ones((1, 2)))
+    np.testing.assert_allclose(result, matrices, atol=1e-12)
+
+
+def test_mirrored_basis_bakes_like_it_applies():
+    basis = random_matrices(np.random.default_rng(6), 4)
+    basis[:2, :3, 0] *= -1.0
+    locations, rotations, scales = decompose_matrices(basis)
+    np.testing.assert_array_less(scales[:2], 0.0)
+    np.testing.assert_allclose(np.linalg.det(rotations), 1.0)
+
+    modes = ['QUATERNION', 'XYZ', 'QUATERNION', 'ZXY']
+    current = {'rotation_quaternion': np.tile([1.0, 0.0, 0.0, 0.0], (4, 1)), 'rotation_euler': np.zeros((4, 3)),
+               'rotation_axis_angle': np.tile([0.0, 0.0, 1.0, 0.0], (4, 1))}
+    channels = basis_to_channels(basis, modes, current)
+    baked_locations, quaternions, eulers, baked_scales = decompose_basis_sequence(basis[None], modes)
+    np.testing.assert_allclose(baked_locations[0], channels['location'])
+    np.testing.assert_allclose(baked_scales[0], channels['scale'])
+    np.testing.assert_allclose(quaternions[0, [0, 2]], channels['rotation_quaternion'][[0, 2]], atol=1e-12)
+    np.testing.assert_allclose(eulers[0, [1, 3]], channels['rotation_euler'][[1, 3]], atol=1e-12)
+    rebuilt = quaternions_to_matrices(quaternions[0]) * baked_scales[0][:, None, :]
+    np.testing.assert_allclose(rebuilt, basis[:, :3, :3], atol=1e-12)
@@ -0,0 +1,218 @@
+"""Tests of the addon on real armatures, run with pytest when the Blender Python module (pip install bpy) is available."""
+import os
+import sys
+
+import numpy as np
+import pytest
+
+bpy = pytest.importorskip('bpy')
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import pose_bone_transforms as addon
+
+
+def create_armature(name, bone_count):
+    """Creates an armature with a chain of bones, every one parented to the previous one."""
+    obj = bpy.data.objects.new(name, bpy.data.armatures.new(name))
+    bpy.context.scene.collection.objects.link(obj)
+    bpy.context.view_layer.objects.active = obj
+    bpy.ops.object.mode_set(mode='EDIT')
+    previous = None
+    for i in range(bone_count):
+        bone = obj.data.edit_bones.new('bone_{}'.format(i))
+        bone.head, bone.tail = (0.0, 0.0, float(i)), (0.0, 0.0, float(i + 1))
+        bone.parent = previous
+        previous = bone
+    bpy.ops.object.mode_set(mode='OBJECT')
+    return obj
+
+
+def randomize_pose(armature, seed):
+    rng = np.random.default_rng(seed)
+    bones = armature.pose.bones
+    quaternions = rng.normal(size=(len(bones), 4))
+    quaternions /= np.linalg.norm(quaternions, axis=1, keepdims=True)
+    bones.foreach_set('rotation_quaternion', quaternions.ravel())
+    bones.foreach_set('location', rng.uniform(-0.1, 0.1, size=len(bones) * 3))
+    evaluate(armature)
+
+
+def evaluate(*armatures):
+    """Tags the armatures and updates the scene, so that pose_bone.matrix reflects channels written with foreach_set."""
+    for armature in armatures:
+        armature.update_tag()
+    bpy.context.view_layer.update()
+
+
+def assert_posed_like(armature, other):
+    np.testing.assert_allclose(addon.get_pose_matrices(armature), addon.get_pose_matrices(other), atol=1e-5)
+
+
+def assert_not_posed_like(armature, other):
+    assert np.abs(addon.get_pose_matrices(armature) - addon.get_pose_matrices(other)).max() > 0.1
+
+
+@pytest.fixture
+def armatures():
+    bpy.ops.wm.read_factory_settings(use_empty=True)
+    # Nothing recorded by a previous test's armatures of the same names carries over
+    addon.proportions_state_reset()
+    target_armature = create_armature('target', 4)
+    source_armature = create_armature('source', 4)
+    randomize_pose(source_armature, 1)
+    return target_armature, source_armature
+
+
+@pytest.mark.parametrize('constraint_type', sorted(addon.COPY_CONSTRAINT_TYPES))
+def test_reused_constraints_match_new_ones(armatures, constraint_type):
+    target_armature, source_armature = armatures
+    addon.apply_proportions(target_armature, source_armature, constraint_type)
+    settings = addon.get_new_constraint_settings(target_armature.pose.bones[0], constraint_type)
+
+    # The second run reuses the constraints of the first one
+    result = addon.apply_proportions(target_armature, source_armature, constraint_type)
+    assert result['reused'] == len(target_armature.pose.bones)
+    for bone in target_armature.pose.bones:
+        constraint, = bone.constraints
+        assert constraint.influence == 1.0 and not constraint.mute
+        for identifier, value in settings.items():
+            current = getattr(constraint, identifier)
+            assert (set(current) if isinstance(value, set) else tuple(current) if isinstance(value, tuple) else current) == value
+
+
+@pytest.mark.parametrize('direct_apply', [False, True])
+def test_visual_transform_matches_source(armatures, direct_apply):
+    target_armature, source_armature = armatures
+    assert_not_posed_like(target_armature, source_armature)
+    addon.apply_proportions(target_armature, source_armature, 'COPY_TRANSFORMS', True, direct_apply)
+    evaluate(target_armature)
+    assert not any(bone.constraints for bone in target_armature.pose.bones)
+    assert_posed_like(target_armature, source_armature)
+
+
+def test_only_changed_bones_after_another_engine(armatures):
+    target_armature, source_armature = armatures
+    other_armature = create_armature('other', 4)
+    randomize_pose(other_armature, 2)
+    addon.apply_proportions(target_armature, source_armature, 'COPY_TRANSFORMS', True, True, incremental=True)
+    # The constraint based visual transform poses the target after another source
+    addon.apply_proportions(target_armature, other_armature, 'COPY_TRANSFORMS', True)
+    evaluate(target_armature)
+    assert_not_posed_like(target_armature, source_armature)
+
+    result = addon.apply_proportions(target_armature, source_armature, 'COPY_TRANSFORMS', True, True, incremental=True)
+    evaluate(target_armature)
+    assert result['message'].startswith('Visual Transform re-applied directly on 4 ')
+    assert_posed_like(target_armature, source_armature)
+
+
+@pytest.mark.parametrize('edited', ['source', 'target'])
+def test_only_changed_bones_reapplies_edited_bone_and_descendants(armatures, edited):
+    target_armature, source_armature = armatures
+    addon.apply_proportions(target_armature, source_armature, 'COPY_TRANSFORMS', True, True, incremental=True)
+    evaluate(target_armature)
+    result = addon.apply_proportions(target_armature, source_armature, 'COPY_TRANSFORMS', True, True, incremental=True)
+    assert result['message'].startswith('Visual Transform re-applied directly on 0 ')
+
+    # Editing bone_2 of the chain moves bone_3 along with it
+    armature = source_armature if edited == 'source' else target_armature
+    armature.pose.bones['bone_2'].location[0] += 0.5
+    evaluate(armature)
+    assert_not_posed_like(target_armature, source_armature)
+    result = addon.apply_proportions(target_armature, source_armature, 'COPY_TRANSFORMS', True, True, incremental=True)
+    evaluate(target_armature)
+    assert result['message'].startswith('Visual Transform re-applied directly on 2 ')
+    assert_posed_like(target_armature, source_armature)
+
+
+def test_direct_apply_removes_source_constraints(armatures):
+    target_armature, source_armature = armatures
+    assert_not_posed_like(target_armature, source_armature)
+    addon.apply_proportions(target_armature, source_armature, 'COPY_ROTATION')
+    with pytest.raises(ValueError, match='Enable Clear Previous'):
+        addon.apply_proportions(target_armature, source_armature, 'COPY_TRANSFORMS', True, True)
+
+    # Constraints of the transferred type are replaced by the transfer, Clear Previous removes the others first
+    addon.apply_proportions(target_armature, source_armature, 'COPY_TRANSFORMS')
+    result = addon.apply_proportions(target_armature, source_armature, 'COPY_TRANSFORMS', True, True, clear_previous=True)
+    assert result['removed'] == 2 * len(target_armature.pose.bones)
+    addon.apply_proportions(target_armature, source_armature, 'COPY_TRANSFORMS')
+    result = addon.apply_proportions(target_armature, source_armature, 'COPY_TRANSFORMS', True, True)
+    assert result['removed'] == len(target_armature.pose.bones)
+    evaluate(target_armature)
+    assert not any(bone.constraints for bone in target_armature.pose.bones)
+    assert_posed_like(target_armature, source_armature)
+
+
+def test_operator_blends_listed_sources(armatures):
+    target_armature, source_armature = armatures
+    other_armature = create_armature('other', 4)
+    randomize_pose(other_armature, 2)
+    assert_not_posed_like(source_armature, other_armature)
+    addon.register()
+    try:
+        bpy.context.view_layer.objects.active = target_armature
+        bpy.ops.object.mode_set(mode='POSE')
+        addon.ApplyCopyTransformsConstraints.dialog_shown = True
+        result = bpy.ops.pose.copy_transforms_from_other(blend_sources=[{'name': '', 'armature': source_armature.name, 'weight': 0.75},
+                                                                        {'name': '', 'armature': other_armature.name, 'weight': 0.25}],
+                                                          constraint_type='COPY_TRANSFORMS')
+    finally:
+        addon.ApplyCopyTransformsConstraints.dialog_shown = False
+        addon.unregister()
+    assert result == {'FINISHED'}
+    matrices = np.stack([addon.get_pose_matrices(source_armature), addon.get_pose_matrices(other_armature)])
+    expected, blended = addon.blend_matrices(matrices, np.array([[0.75] * 4, [0.25] * 4]))
+    assert blended.all() and np.abs(expected - matrices[0]).max() > 0.1 and np.abs(expected - matrices[1]).max() > 0.1
+    np.testing.assert_allclose(addon.get_pose_matrices(target_armature), expected, atol=1e-5)
+
+
+def test_operator_direct_apply_updates_target(armatures):
+    target_armature, source_armature = armatures
+    addon.register()
+    try:
+        bpy.context.view_layer.objects.active = target_armature
+        bpy.ops.object.mode_set(mode='POSE')
+        addon.ApplyCopyTransformsConstraints.dialog_shown = True
+        bpy.ops.pose.copy_transforms_from_other(source_armature=source_armature.name, constraint_type='COPY_TRANSFORMS',
+                                                apply_visual_transform=True, direct_apply=True)
+    finally:
+        addon.ApplyCopyTransformsConstraints.dialog_shown = False
+        addon.unregister()
+    # The operator's own scene update shows the new pose, without tagging the target here
+    assert_posed_like(target_armature, source_armature)
+
+
+def test_vrd_trigger_position_is_relative_to_basepos(armatures, tmp_path):
+    _, source_armature = armatures
+    path = str(tmp_path / 'helpers.vrd')
+    addon.register()
+    try:
+        bpy.context.view_layer.objects.active = source_armature
+        bpy.ops.object.mode_set(mode='POSE')
+        result = bpy.ops.pose.export_parent_bone_transforms(filepath=path, file_format='VRD', control_bone='bone_1', only_selected=False)
+    finally:
+        addon.unregister()
+    assert result == {'FINISHED'}
+    with open(path, encoding='utf-8') as file:
+        blocks = [block.splitlines() for block in file.read().strip().split('\n\n')]
+    # bone_0 is a root and bone_1 the control bone, both skipped
+    assert [block[0] for block in blocks] == ['<helper> bone_2 bone_1 bone_0 bone_1', '<helper> bone_3 bone_2 bone_0 bone_1']
+    for helper, basepos, trigger in blocks:
+        assert basepos.split()[1:] != ['0', '0', '0'] and trigger.split()[-3:] == ['0', '0', '0']
+
+
+def test_empty_bake_range_is_rejected(armatures):
+    target_armature, source_armature = armatures
+    with pytest.raises(ValueError, match='No frames to bake'):
+        addon.apply_proportions(target_armature, source_armature, 'COPY_TRANSFORMS', True, bake_frames=[])
+    assert not any(bone.constraints for bone in target_armature.pose.bones)
+    assert_not_posed_like(target_armature, source_armature)
+
+    addon.register()
+    try:
+        properties = bpy.context.window_manager.operator_properties_last(addon.ApplyCopyTransformsConstraints.bl_idname)
+        properties.frame_start, properties.frame_end = 10, 5
+        assert properties.frame_end == 10
+    finally:
+        addon.unregister()